@@ -0,0 +1,40 @@
+"""
+Native Request-Parsing Helpers for Raspberry Pi Pico 2 W
+Byte loops compiled by the viper emitter instead of run as bytecode
+MicroPython v1.27.0 compatible
+
+Kept apart from http_server.py so a port without the viper emitter fails
+this import alone (SyntaxError) and the server falls back to its
+pure-Python paths.
+"""
+
+import micropython
+
+
+@micropython.viper
+def pct_decode(src: ptr8, n: int, dst: ptr8, lut: ptr8) -> int:
+    """
+    URL-decode n bytes of src into dst, returning the decoded length.
+
+    dst must hold at least n bytes. lut maps each byte to its hex digit
+    value, or 0xFF for non-hex bytes. Invalid escapes are copied as-is.
+    """
+    i = 0
+    j = 0
+    while i < n:
+        c = src[i]
+        if c == 0x25 and i + 2 < n:  # '%'
+            hi = lut[src[i + 1]]
+            lo = lut[src[i + 2]]
+            if (hi | lo) < 16:
+                dst[j] = (hi << 4) | lo
+                j += 1
+                i += 3
+                continue
+        if c == 0x2B:  # '+'
+            dst[j] = 0x20
+        else:
+            dst[j] = c
+        j += 1
+        i += 1
+    return j
@@ -7,13 +7,18 @@ MicroPython v1.27.0 compatible
 
 import json
 from machine import Pin
+from micropython import const
+
+# Set to 1 to log every relay write; the compiler drops the disabled branches
+_DEBUG = const(0)
 
 # GPIO Pin Configuration for Pico 2 W
+# Static pin metadata only; live relay state is tracked in GPIOControl.states
 RELAY_PINS = {
-    14: {"name": "Enlarger Timer", "state": False},
-    15: {"name": "Safelight", "state": False},
-    16: {"name": "Heating Element", "state": False},
-    17: {"name": "White Light", "state": False}
+    14: {"name": "Enlarger Timer"},
+    15: {"name": "Safelight"},
+    16: {"name": "Heating Element"},
+    17: {"name": "White Light"}
 }
 
 # Pin numbers for automatic safelight control
@@ -43,7 +48,8 @@ class GPIOControl:
             # Set to HIGH (OFF for active-low relays)
             self.pins[pin_num].value(1)
             self.states[pin_num] = False
-            print(f"GPIO {pin_num} ({RELAY_PINS[pin_num]['name']}): initialized OFF")
+            if _DEBUG:
+                print(f"GPIO {pin_num} ({RELAY_PINS[pin_num]['name']}): initialized OFF")
         
         print("GPIO setup complete")
         status_str = "ENABLED" if self.auto_safelight else "DISABLED"
@@ -74,8 +80,9 @@ class GPIOControl:
         self.pins[pin].value(pin_value)
         self.states[pin] = state
         
-        state_str = "ON" if state else "OFF"
-        print(f"GPIO {pin} ({RELAY_PINS[pin]['name']}): {state_str}")
+        if _DEBUG:
+            state_str = "ON" if state else "OFF"
+            print(f"GPIO {pin} ({RELAY_PINS[pin]['name']}): {state_str}")
         
         # Automatic safelight control (only if enabled and not already recursing)
         if self.auto_safelight and not skip_auto_safelight and pin == ENLARGER_PIN:
@@ -84,7 +91,8 @@ class GPIOControl:
                 if self.states.get(SAFELIGHT_PIN, False):
                     self._safelight_was_on = True
                     self.set_relay_state(SAFELIGHT_PIN, False, skip_auto_safelight=True)
-                    print(f"  → Auto-safelight: turning OFF (enlarger is ON)")
+                    if _DEBUG:
+                        print("  → Auto-safelight: turning OFF (enlarger is ON)")
                 else:
                     self._safelight_was_on = False
             else:
@@ -92,7 +100,8 @@ class GPIOControl:
                 if self._safelight_was_on:
                     self._safelight_was_on = False
                     self.set_relay_state(SAFELIGHT_PIN, True, skip_auto_safelight=True)
-                    print(f"  → Auto-safelight: turning ON (enlarger is OFF)")
+                    if _DEBUG:
+                        print("  → Auto-safelight: turning ON (enlarger is OFF)")
         
         return True
     
@@ -10,16 +10,311 @@ import json
 import time
 import gc
 import os
+from collections import deque
+from micropython import const
+try:
+    # The event loop's own poller (select.poll under the hood)
+    from asyncio.core import _io_queue
+except ImportError:
+    _io_queue = None
+try:
+    # C URL decoder, only in custom firmware built with modules_c/
+    from mp_urlparse import url_decode as _c_url_decode
+except ImportError:
+    _c_url_decode = None
+try:
+    # Native URL decoder; the import fails where viper isn't available
+    from lib.fastparse import pct_decode as _pct_decode
+except (ImportError, SyntaxError):
+    _pct_decode = None
 from lib.paper_database import get_paper_list, get_paper_data, get_paper_display_name
 from lib.light_sensor import TSL2591
-
-# Server Configuration
-HTTP_PORT = 80
-CHUNK_SIZE = 512
-SOCKET_TIMEOUT = 30
+from lib.gpio_control import RELAY_PINS
+
+# Server Configuration (const: inlined by the compiler at each use)
+HTTP_PORT = const(80)
+CHUNK_SIZE = const(512)
+SOCKET_TIMEOUT = const(30)
+RECV_SIZE = const(2048)
+RECV_POOL_SIZE = const(2)
+CHUNK_POOL_SIZE = const(2)
+RESP_SIZE = const(1024)     # Larger JSON responses fall back to one join
+RESP_POOL_SIZE = const(2)
+ERR_CACHE_SIZE = const(16)
+MAX_INFLIGHT = const(6)     # Requests being handled before new connections get 503
+MAX_IDLE = const(4)         # Kept-alive connections waiting for their next request
+MAX_BUSY = const(2)         # Connections being sent a 503 and drained at once
+KEEPALIVE_MS = const(5000)  # Idle time before a kept-alive connection is closed
+KEEPALIVE_MAX = const(100)  # Requests served on one connection
+
+_TIMEOUT_MS = const(SOCKET_TIMEOUT * 1000)
+_YIELD_MS = const(20)       # Longest a streaming send runs without yielding
+_SEND_SPINS = const(4)      # EAGAIN retries that only yield before sleeping
+_DRAIN_MS = const(1000)     # Longest spent discarding an unread request before closing
+_EAGAIN = const(11)
+_ETIMEDOUT = const(110)
+
+# Set to 1 to log every request; the compiler drops the disabled branches
+_DEBUG = const(0)
+_LOG_SIZE = const(32)       # Requests kept for /log when _DEBUG is on
+
+# Recent requests as (ticks_ms, method, path, client IP), oldest first.
+# Kept in RAM instead of printed, so logging never blocks on the console.
+_log = deque((), _LOG_SIZE) if _DEBUG else None
+
+# Disable Nagle on accepted sockets. Builds that don't name the constants
+# get lwIP's numeric values; a stack without the option just raises OSError.
+_IPPROTO_TCP = getattr(socket, 'IPPROTO_TCP', 6)
+_TCP_NODELAY = getattr(socket, 'TCP_NODELAY', 1)
 
 # HTML file to serve
 HTML_FILE = "index.html"
+HTML_GZ_FILE = HTML_FILE + ".gz"  # Optional pre-compressed copy
+HTML_CACHE_MAX = const(32768)  # Keep the HTML in RAM only up to this size
+
+# Hex digit value for every byte (0xFF = not a hex digit), for percent-decoding
+_HEX = bytearray(b'\xff' * 256)
+for _i, _c in enumerate(b'0123456789abcdef'):
+    _HEX[_c] = _i
+for _i, _c in enumerate(b'ABCDEF'):
+    _HEX[_c] = 10 + _i
+del _i, _c
+
+# Request headers kept by the parser (raw lowercase name -> dict key)
+_HEADER_KEYS = {
+    b'content-length': 'content-length',
+    b'accept-encoding': 'accept-encoding',
+    b'connection': 'connection',
+}
+
+# Light meter config parameters -> TSL2591 register values
+_GAIN_MAP = {
+    'low': TSL2591.GAIN_LOW,
+    'med': TSL2591.GAIN_MED,
+    'high': TSL2591.GAIN_HIGH,
+    'max': TSL2591.GAIN_MAX,
+}
+_INT_MAP = {
+    '100': TSL2591.INTEGRATIONTIME_100MS,
+    '200': TSL2591.INTEGRATIONTIME_200MS,
+    '300': TSL2591.INTEGRATIONTIME_300MS,
+    '400': TSL2591.INTEGRATIONTIME_400MS,
+    '500': TSL2591.INTEGRATIONTIME_500MS,
+    '600': TSL2591.INTEGRATIONTIME_600MS,
+}
+
+# Legacy filter_system values still accepted by /light-meter-config
+_FILTER_SYSTEMS = (
+    'ilford', 'foma_fomaspeed', 'foma_fomatone',
+    'foma_fomapastel_mg', 'fomatone_mg_classic_variant',
+    'ilford_cooltone', 'ilford_warmtone', 'ilford_iv_rc_portfolio',
+    'ilford_multigrade_rc_deluxe_new', 'ilford_multigrade_rc_portfolio_new',
+    'ilford_fb_classic', 'ilford_fb_warmtone', 'ilford_fb_cooltone',
+    'foma_fomabrom',
+)
+
+# Relay pins accepted by the API, and their query spellings -> pin number
+_VALID_PINS = frozenset(RELAY_PINS)
+_PIN_ARGS = {str(_p): _p for _p in RELAY_PINS}
+
+# Serialized entry per relay for /status and /all: (pin, off JSON, on JSON)
+_RELAY_JSON = tuple(
+    (pin,
+     b'"%d": {"name": "' % pin + info["name"].encode() + b'", "state": false}',
+     b'"%d": {"name": "' % pin + info["name"].encode() + b'", "state": true}')
+    for pin, info in RELAY_PINS.items()
+)
+
+# Relay state / enabled parameters -> bool. Holds the casings clients send,
+# so the value is looked up as-is without a lower() copy per request.
+_STATE = {'on': True, 'off': False, 'ON': True, 'OFF': False, 'On': True, 'Off': False}
+_ENABLED = {'true': True, 'false': False, 'True': True, 'False': False,
+            'TRUE': True, 'FALSE': False, '1': True, '0': False}
+
+# Constant response header fragments, encoded once at import
+_CORS = (
+    b"Access-Control-Allow-Origin: *\r\n"
+    b"Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n"
+    b"Access-Control-Allow-Headers: Content-Type, Authorization\r\n"
+    b"Access-Control-Max-Age: 86400\r\n"
+)
+_STATUS = {
+    200: b"HTTP/1.1 200 OK\r\n",
+    400: b"HTTP/1.1 400 Bad Request\r\n",
+    404: b"HTTP/1.1 404 Not Found\r\n",
+    413: b"HTTP/1.1 413 Payload Too Large\r\n",
+    431: b"HTTP/1.1 431 Request Header Fields Too Large\r\n",
+    500: b"HTTP/1.1 500 Internal Server Error\r\n",
+}
+
+
+# Sent instead of Connection: close on responses with a known length.
+# Advertises a second less than KEEPALIVE_MS, so a client stops reusing
+# the connection before the server's idle timeout can close it under a
+# request already in flight.
+_KEEP_ALIVE = b"Keep-Alive: timeout=%d\r\n" % (KEEPALIVE_MS // 1000 - 1)
+# Swapped in for _KEEP_ALIVE when the server closes after the response
+_CLOSE = b"Connection: close\r\n"
+
+# Fixed responses that never vary
+_OPTIONS_RESPONSE = _STATUS[200] + _CORS + b"Content-Length: 0\r\n" + _KEEP_ALIVE + b"\r\n"
+_FAVICON_RESPONSE = b"HTTP/1.1 204 No Content\r\n" + _KEEP_ALIVE + b"\r\n"
+_BUSY_RESPONSE = (b"HTTP/1.1 503 Service Unavailable\r\n" + _CORS
+                  + b"Retry-After: 1\r\nContent-Length: 0\r\n" + _CLOSE + b"\r\n")
+
+
+def _wait_readable(sock):
+    """Suspend the calling task until sock is readable (await this)."""
+    yield _io_queue.queue_read(sock)
+
+
+_JSON_TYPE = b"Content-Type: application/json; charset=utf-8\r\nContent-Length: "
+_JSON_TAIL = b"\r\n" + _CORS + _KEEP_ALIVE + b"\r\n"
+_JSON_TAIL_CLOSE = b"\r\n" + _CORS + _CLOSE + b"\r\n"
+
+
+def _json_body_response(body, status=200):
+    """Build response around an already-serialized JSON body."""
+    status_line = _STATUS.get(status) or b"HTTP/1.1 %d Error\r\n" % status
+    # One join allocates the final buffer once; chained + copies every prefix
+    return b"".join((status_line, _JSON_TYPE, b"%d" % len(body), _JSON_TAIL, body))
+
+
+def _error_response(message, status=400):
+    """Build a complete JSON error response, for errors with fixed text."""
+    return _json_body_response(json.dumps({"error": message}).encode(), status)
+
+
+# Recurring error responses, built once at import
+_ERR_STATE = _error_response("State must be 'on' or 'off'")
+_ERR_ENABLED = _error_response("enabled parameter required (true/false)")
+_ERR_NO_TEMP = _error_response("Temperature sensor not configured")
+_ERR_NO_METER = _error_response("Light meter not configured")
+_ERR_NO_STA = _error_response("WiFi STA not available")
+_ERR_RELAY = _error_response("Failed to set relay state", 500)
+_ERR_HEADERS = _error_response("Request headers too large", 431)
+_ERR_NO_HTML = _error_response("HTML file not found", 404)
+_ERR_PAYLOAD = _error_response("Payload too large", 413)
+_ERR_BAD_JSON = _error_response("Invalid JSON")
+_ERR_NO_UPDATER = _json_body_response(
+    json.dumps({'success': False, 'error': 'UpdateManager not initialized'}).encode(), 400)
+_ERR_BAD_PIN = _error_response("Invalid GPIO pin. Valid pins: 14, 15, 16, 17")
+_ERR_DURATION = _error_response("Duration must be a number above 0 and at most 3600s")
+_ERR_SSID = _error_response("SSID is required")
+_ERR_PASSWORD = _error_response("Password must be at least 8 characters")
+_ERR_TARGET = _error_response("Target temperature is required (query param: ?target=X)")
+_ERR_TARGET_RANGE = _error_response("Target temperature out of range. Valid range: 15°C - 50°C")
+_ERR_DEADZONE = _error_response("Dead zone out of range. Valid range: 0.1 - 5.0°C")
+_ERR_CAL_REQUIRED = _error_response("Calibration constant required (?constant=X)")
+_ERR_CAL_POSITIVE = _error_response("Calibration constant must be positive")
+_ERR_CAL_INVALID = _error_response("Invalid calibration value")
+_ERR_GAIN = _error_response("Invalid gain. Use: low, med, high, max, auto")
+_ERR_INTEGRATION = _error_response("Invalid integration. Use: 100, 200, 300, 400, 500, 600")
+
+# /wifi-config?wait=0 reply body; the outcome is polled from /wifi-status
+_WIFI_PENDING = b'{"status": "pending", "poll": "/wifi-status"}'
+
+
+def _url_decode(b):
+    """Decode URL-encoded bytes (percent escapes and '+'), returning bytes."""
+    if b'%' not in b and b'+' not in b:
+        return b
+    
+    if _c_url_decode is not None:
+        return _c_url_decode(b)
+    
+    if _pct_decode is not None:
+        n = len(b)
+        out = bytearray(n)
+        return bytes(memoryview(out)[:_pct_decode(b, n, out, _HEX)])
+    
+    parts = b.replace(b'+', b' ').split(b'%')
+    out = bytearray(parts[0])
+    for part in parts[1:]:
+        if len(part) >= 2:
+            hi = _HEX[part[0]]
+            lo = _HEX[part[1]]
+            if hi | lo < 16:
+                out.append((hi << 4) | lo)
+                out.extend(part[2:])
+                continue
+        # Not a valid escape - keep the '%' literally
+        out.append(0x25)
+        out.extend(part)
+    return bytes(out)
+
+
+def _to_str(b):
+    """Decode UTF-8 bytes; fall back to one char per byte if invalid."""
+    try:
+        return b.decode()
+    except UnicodeError:
+        return ''.join([chr(c) for c in b])
+
+
+# Characters a number parameter can hold. strip() with these leaves nothing
+# for a plausible number, so typos are refused without raising ValueError.
+_FLOAT_CHARS = '0123456789.+-eE '
+
+
+def _try_float(v):
+    """Return v as a float, or None if it is absent, empty or not a number."""
+    if not v or v.strip(_FLOAT_CHARS):
+        return None
+    try:
+        return float(v)
+    except ValueError:
+        # Right characters in the wrong order, e.g. '1.2.3'
+        return None
+
+
+class _Query:
+    """
+    Query string parameters, decoded only when a handler asks for one.
+    
+    Most handlers read one or two keys (and /status none), so instead of
+    decoding every pair into a dict up front, get() scans the raw bytes
+    for the requested key and decodes just its value.
+    """
+    
+    def __init__(self, raw):
+        self._raw = raw
+        self._extra = None  # Values set by the server, e.g. '__body__'
+        # The UI's own requests never need decoding; check the whole query
+        # once here rather than each value in get()
+        self._plain = b'%' not in raw and b'+' not in raw
+    
+    def __setitem__(self, key, value):
+        if self._extra is None:
+            self._extra = {}
+        self._extra[key] = value
+    
+    def get(self, key, default=None):
+        extra = self._extra
+        if extra and key in extra:
+            return extra[key]
+        raw = self._raw
+        if not raw:
+            return default
+        
+        name = key.encode()
+        n = len(name)
+        size = len(raw)
+        i = 0
+        while i < size:
+            j = raw.find(b'&', i)
+            if j < 0:
+                j = size
+            # Pair raw[i:j] matches as 'name=value' or a bare 'name'
+            if raw.startswith(name, i):
+                k = i + n
+                if k == j:
+                    return ''
+                if raw[k] == 0x3D:  # '='
+                    value = raw[k + 1:j]
+                    return _to_str(value if self._plain else _url_decode(value))
+            i = j + 1
+        return default
 
 
 class HTTPServer:
@@ -33,6 +328,58 @@ class HTTPServer:
     - WiFi configuration endpoint
     """
     
+    # Route table: path -> handler method name. Names are swapped for the
+    # plain functions after the class body (see below the class).
+    _ROUTES = {
+        '/ping':                          '_handle_ping',
+        '/relay':                         '_handle_relay',
+        '/timer':                         '_handle_timer',
+        '/status':                        '_handle_status',
+        '/snapshot':                      '_handle_snapshot',
+        '/all':                           '_handle_all',
+        '/auto-safelight':                '_handle_auto_safelight',
+        '/temperature':                   '_handle_temperature',
+        '/temperature-control':           '_handle_temperature_control',
+        '/temperature-enable':            '_handle_temperature_enable',
+        '/temperature-deadzone':          '_handle_temperature_deadzone',
+        '/wifi-status':                   '_handle_wifi_status',
+        '/wifi-config':                   '_handle_wifi_config',
+        '/wifi-ap-force':                 '_handle_wifi_ap_force',
+        '/wifi-clear':                    '_handle_wifi_clear',
+        '/papers':                        '_handle_papers',
+        '/light-meter-paper':             '_handle_light_meter_paper',
+        '/light-meter':                   '_handle_light_meter',
+        '/light-meter-highlight':         '_handle_light_meter_highlight',
+        '/light-meter-shadow':            '_handle_light_meter_shadow',
+        '/light-meter-contrast':          '_handle_light_meter_contrast',
+        '/light-meter-split-grade-heiland': '_handle_light_meter_split_grade_heiland',
+        '/light-meter-virtual-proof':     '_handle_light_meter_virtual_proof',
+        '/light-meter-calibrate':         '_handle_light_meter_calibrate',
+        '/light-meter-config':            '_handle_light_meter_config',
+        '/light-meter-dark-offset':       '_handle_light_meter_dark_offset',
+        '/light-meter-gain-calibrate':    '_handle_light_meter_gain_calibrate',
+        '/splitgrade-settings':           '_handle_splitgrade_settings',
+        '/update-check':                  '_handle_update_check',
+        '/update-check-only':             '_handle_update_check_only',
+        '/version':                       '_handle_version',
+        '/app-data':                      '_handle_app_data',
+    }
+    
+    # Routes that need self.light_meter. Checked once in the dispatcher
+    # instead of a guard at the top of each handler, which also avoids the
+    # extra coroutine frame a wrapping decorator would cost per request.
+    _METER_ROUTES = frozenset((
+        '/light-meter-paper', '/light-meter', '/light-meter-highlight',
+        '/light-meter-shadow', '/light-meter-contrast',
+        '/light-meter-split-grade-heiland', '/light-meter-virtual-proof',
+        '/light-meter-calibrate', '/light-meter-config',
+        '/light-meter-dark-offset', '/light-meter-gain-calibrate',
+        '/splitgrade-settings',
+    ))
+    
+    # Routes that may restart the board, so they never keep the connection open
+    _CLOSE_ROUTES = frozenset(('/update-check',))
+    
     def __init__(self, gpio_control, timer_manager, wifi_ap=None, wifi_sta=None, light_meter=None, update_manager=None):
         """
         Initialize HTTP server.
@@ -53,112 +400,126 @@ class HTTPServer:
         self.update_manager = update_manager
         self.sock = None
         self.running = False
+        self._inflight = 0  # Connections with a request being handled
+        self._idle = 0      # Kept-alive connections waiting between requests
+        self._busy = 0      # Connections being turned away with a 503
+        # Connections whose current response is their last; replies to these
+        # say Connection: close instead of Keep-Alive
+        self._closing = set()
+        # Last /wifi-config attempt: None, 'connecting', 'connected' or 'failed'
+        self._wifi_state = None
         
-        # Route table: path -> handler(conn, params)
-        self._routes = {
-            '/ping':                          self._handle_ping,
-            '/relay':                         self._handle_relay,
-            '/timer':                         self._handle_timer,
-            '/status':                        self._handle_status,
-            '/all':                           self._handle_all,
-            '/auto-safelight':                self._handle_auto_safelight,
-            '/temperature':                   self._handle_temperature,
-            '/temperature-control':           self._handle_temperature_control,
-            '/temperature-enable':            self._handle_temperature_enable,
-            '/temperature-deadzone':          self._handle_temperature_deadzone,
-            '/wifi-status':                   self._handle_wifi_status,
-            '/wifi-config':                   self._handle_wifi_config,
-            '/wifi-ap-force':                 self._handle_wifi_ap_force,
-            '/wifi-clear':                    self._handle_wifi_clear,
-            '/papers':                        self._handle_papers,
-            '/light-meter-paper':             self._handle_light_meter_paper,
-            '/light-meter':                   self._handle_light_meter,
-            '/light-meter-highlight':         self._handle_light_meter_highlight,
-            '/light-meter-shadow':            self._handle_light_meter_shadow,
-            '/light-meter-contrast':          self._handle_light_meter_contrast,
-            '/light-meter-split-grade-heiland': self._handle_light_meter_split_grade_heiland,
-            '/light-meter-virtual-proof':     self._handle_light_meter_virtual_proof,
-            '/light-meter-calibrate':         self._handle_light_meter_calibrate,
-            '/light-meter-config':            self._handle_light_meter_config,
-            '/light-meter-dark-offset':       self._handle_light_meter_dark_offset,
-            '/light-meter-gain-calibrate':    self._handle_light_meter_gain_calibrate,
-            '/splitgrade-settings':           self._handle_splitgrade_settings,
-            '/update-check':                  self._handle_update_check,
-            '/update-check-only':             self._handle_update_check_only,
-            '/version':                       self._handle_version,
-            '/app-data':                      self._handle_app_data,
-        }
+        # Reusable request buffers, checked out per connection
+        self._recv_pool = [bytearray(RECV_SIZE) for _ in range(RECV_POOL_SIZE)]
+        # Reusable file-streaming buffers, checked out per response
+        self._chunk_pool = [bytearray(CHUNK_SIZE) for _ in range(CHUNK_POOL_SIZE)]
+        # Reusable JSON response buffers; handlers interleave at every await
+        # in _sendall, so each send checks one out instead of sharing one
+        self._resp_pool = [bytearray(RESP_SIZE) for _ in range(RESP_POOL_SIZE)]
+        # Error responses whose text is computed at runtime but repeats
+        self._err_cache = {}
+        # /papers response as (header, body), built on first request
+        self._papers_cache = None
+        # /light-meter-paper body up to its timestamp, as (paper_id, bytes);
+        # rebuilt only when the selected paper changes
+        self._paper_cache = None
+        
+        # HTML response header (and body, if small enough), built once.
+        # Updates replace index.html and then soft-reset, so this can't go stale.
+        self._html_header = None
+        self._html_gz_header = None
+        self._html_cache = None
+        self._html_gz_cache = None
+        self._load_html_cache()
     
-    def _cors_headers(self):
-        """Return CORS headers string."""
-        return (
-            "Access-Control-Allow-Origin: *\r\n"
-            "Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n"
-            "Access-Control-Allow-Headers: Content-Type, Authorization\r\n"
-            "Access-Control-Max-Age: 86400\r\n"
-        )
-    
-    async def _require_light_meter(self, conn):
-        """Send 400 if light meter is missing. Returns True when absent."""
-        if not self.light_meter:
-            response = self._json_response({
-                "error": "Light meter not configured"
-            }, 400)
-            await self._sendall(conn, response)
-            return True
-        return False
+    def _head(self, conn, blob):
+        """Return a prebuilt header (or response) with the connection header conn needs."""
+        if conn in self._closing:
+            return blob.replace(_KEEP_ALIVE, _CLOSE, 1)
+        return blob
+    
+    async def _reply_err(self, conn, blob):
+        """Send a prebuilt error response."""
+        await self._sendall(conn, self._head(conn, blob))
+    
+    async def _send_error(self, conn, msg, status=400):
+        """Send a JSON error, reusing the built response if this text was sent before."""
+        key = (status, msg)
+        response = self._err_cache.get(key)
+        if response is None:
+            if len(self._err_cache) >= ERR_CACHE_SIZE:
+                self._err_cache.clear()
+            response = _error_response(msg, status)
+            self._err_cache[key] = response
+        await self._reply_err(conn, response)
+    
+    async def _reject(self, conn, msg, status=400):
+        """Send a one-off JSON error, e.g. text carrying an exception message."""
+        await self._send_json_body(conn, json.dumps({"error": msg}).encode(), status)
+    
+    def _norm(self, params, key):
+        """Return a parameter stripped and lowercased, or None if absent or empty."""
+        v = params.get(key)
+        return v.strip().lower() if v else None
+    
+    def _get_pin(self, params):
+        """Read the gpio parameter (default 14). Returns None unless it names a relay pin."""
+        v = params.get('gpio')
+        if v is None:
+            return 14
+        # The UI always sends the plain number: one dict hit, no int()
+        pin = _PIN_ARGS.get(v)
+        if pin is None:
+            # Other spellings (' 14', '014') go the long way
+            try:
+                pin = int(v)
+            except ValueError:
+                return None
+            if pin not in _VALID_PINS:
+                return None
+        return pin
+    
+    def _get_float(self, params, key, default, lo=None, hi=None):
+        """Read a float parameter. Returns default if absent, None if invalid or out of range."""
+        v = params.get(key)
+        if v is None:
+            return default
+        n = _try_float(v)
+        if n is None:
+            return None
+        if (lo is not None and not n >= lo) or (hi is not None and not n <= hi):
+            return None
+        return n
+    
+    async def _send_json_body(self, conn, body, status=200):
+        """Send a JSON response, assembled in a pooled buffer when it fits."""
+        status_line = _STATUS.get(status) or b"HTTP/1.1 %d Error\r\n" % status
+        length = b"%d" % len(body)
+        tail = _JSON_TAIL_CLOSE if conn in self._closing else _JSON_TAIL
+        parts = (status_line, _JSON_TYPE, length, tail, body)
+        size = len(status_line) + len(_JSON_TYPE) + len(length) + len(tail) + len(body)
+        if size > RESP_SIZE or not self._resp_pool:
+            await self._sendall(conn, b"".join(parts))
+            return
+        
+        buf = self._resp_pool.pop()
+        try:
+            n = 0
+            for part in parts:
+                end = n + len(part)
+                buf[n:end] = part
+                n = end
+            await self._sendall(conn, memoryview(buf)[:n])
+        finally:
+            self._resp_pool.append(buf)
+    
+    async def _send_json(self, conn, data, status=200):
+        """Serialize data and send it as a JSON response."""
+        await self._send_json_body(conn, json.dumps(data).encode(), status)
     
-    _STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
-
     def _json_response(self, data, status=200):
         """Build JSON response."""
-        body_bytes = json.dumps(data).encode()
-        status_text = self._STATUS_TEXT.get(status, "Error")
-        
-        header = (
-            f"HTTP/1.1 {status} {status_text}\r\n"
-            f"Content-Type: application/json; charset=utf-8\r\n"
-            f"Content-Length: {len(body_bytes)}\r\n"
-            f"{self._cors_headers()}"
-            f"Connection: close\r\n"
-            f"\r\n"
-        )
-        return header.encode() + body_bytes
-    
-    def _url_decode(self, s):
-        """Decode URL-encoded string."""
-        result = []
-        i = 0
-        while i < len(s):
-            if s[i] == '%' and i + 2 < len(s):
-                try:
-                    result.append(chr(int(s[i+1:i+3], 16)))
-                    i += 3
-                    continue
-                except (ValueError, IndexError):
-                    pass
-            elif s[i] == '+':
-                result.append(' ')
-                i += 1
-                continue
-            result.append(s[i])
-            i += 1
-        return ''.join(result)
-    
-    def _parse_query_string(self, query):
-        """Parse query string into dictionary."""
-        params = {}
-        if not query:
-            return params
-        
-        for pair in query.split('&'):
-            if '=' in pair:
-                key, value = pair.split('=', 1)
-                params[self._url_decode(key)] = self._url_decode(value)
-            else:
-                params[self._url_decode(pair)] = ''
-        
-        return params
+        return _json_body_response(json.dumps(data).encode(), status)
     
     def _parse_request(self, data):
         """Parse HTTP request, returning method, path, params, headers, and body bytes."""
@@ -166,43 +527,54 @@ class HTTPServer:
             # Find header/body boundary in raw bytes
             boundary = data.find(b'\r\n\r\n')
             if boundary < 0:
-                header_bytes = data
+                boundary = len(data)
                 body = b''
             else:
-                header_bytes = data[:boundary]
                 body = data[boundary + 4:]
-
-            request = header_bytes.decode('utf-8')
-            lines = request.split('\r\n')
-            
-            if not lines:
-                return None, None, None, None, b''
             
-            # Parse request line
-            parts = lines[0].split(' ')
-            if len(parts) < 2:
+            # Request line: METHOD SP target SP version
+            end = data.find(b'\r\n', 0, boundary)
+            if end < 0:
+                end = boundary
+            sp1 = data.find(b' ', 0, end)
+            if sp1 <= 0:
                 return None, None, None, None, b''
+            sp2 = data.find(b' ', sp1 + 1, end)
+            if sp2 < 0:
+                sp2 = end
             
-            method = parts[0]
-            path_with_query = parts[1]
+            method = data[:sp1].decode()
             
-            # Parse path and query string
-            if '?' in path_with_query:
-                path, query = path_with_query.split('?', 1)
+            # Parse path and query string (query stays bytes until decoded)
+            q = data.find(b'?', sp1 + 1, sp2)
+            if q >= 0:
+                path = data[sp1 + 1:q].decode()
+                query = data[q + 1:sp2]
             else:
-                path = path_with_query
-                query = ''
+                path = data[sp1 + 1:sp2].decode()
+                query = b''
             
-            params = self._parse_query_string(query)
+            params = _Query(query)
             
-            # Parse headers
+            # Walk header lines in place rather than splitting the whole block,
+            # keeping (and decoding) only the headers the server reads
             headers = {}
-            for line in lines[1:]:
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    headers[key.strip().lower()] = value.strip()
-                elif line == '':
-                    break
+            i = end + 2
+            while i < boundary:
+                j = data.find(b'\r\n', i, boundary)
+                if j < 0:
+                    j = boundary
+                colon = data.find(b':', i, j)
+                if colon > i:
+                    key = _HEADER_KEYS.get(data[i:colon].strip().lower())
+                    if key:
+                        headers[key] = data[colon + 1:j].strip().decode()
+                i = j + 2
+            
+            # Keep-alive is HTTP/1.1 only: an HTTP/1.0 client asking for it
+            # would wait for a Connection: keep-alive reply the server never sends
+            if data[sp2 + 1:end] != b'HTTP/1.1':
+                headers['connection'] = 'close'
             
             return method, path, params, headers, body
             
@@ -210,251 +582,361 @@ class HTTPServer:
             print(f"Parse error: {e}")
             return None, None, None, None, b''
     
+    async def _recv_into(self, conn, buf, timeout=_TIMEOUT_MS):
+        """Read into buf from a non-blocking socket. Returns byte count (0 on EOF)."""
+        deadline = time.ticks_add(time.ticks_ms(), timeout)
+        while True:
+            n = conn.readinto(buf)
+            if n is not None:
+                return n
+            # None means no data yet (EAGAIN)
+            if time.ticks_diff(deadline, time.ticks_ms()) <= 0:
+                raise OSError(_ETIMEDOUT)
+            await asyncio.sleep_ms(10)
+    
+    async def _drain(self, conn, size=None):
+        """Discard unread request bytes (up to size) so closing doesn't reset the reply."""
+        buf = self._chunk_pool.pop() if self._chunk_pool else bytearray(CHUNK_SIZE)
+        deadline = time.ticks_add(time.ticks_ms(), _DRAIN_MS)
+        try:
+            while size is None or size > 0:
+                left = time.ticks_diff(deadline, time.ticks_ms())
+                if left <= 0:
+                    break
+                n = await self._recv_into(conn, buf, left)
+                if not n:
+                    break
+                if size is not None:
+                    size -= n
+        except OSError:
+            # Timed out or reset; the reply has gone out either way
+            pass
+        finally:
+            if len(self._chunk_pool) < CHUNK_POOL_SIZE:
+                self._chunk_pool.append(buf)
+    
     async def _sendall(self, conn, data):
-        """Send all data with retry logic for buffer management."""
-        total_sent = 0
-        while total_sent < len(data):
+        """
+        Send all data with retry logic for buffer management.
+        
+        On failure the connection is marked closing before the OSError is
+        raised, so a handler that catches it and replies again can't leave
+        a kept-alive connection out of sync.
+        """
+        # Most responses fit the socket buffer: one send, no view allocated
+        size = len(data)
+        try:
+            total_sent = conn.send(data) or 0
+        except OSError as e:
+            if e.args[0] != _EAGAIN:
+                self._closing.add(conn)
+                raise
+            total_sent = 0
+        if total_sent == size:
+            return
+        
+        # Slice a view on partial sends so the unsent tail is never copied
+        mv = data if isinstance(data, memoryview) else memoryview(data)
+        stalls = 0
+        while total_sent < size:
             try:
-                sent = conn.send(data[total_sent:])
-                if sent == 0:
-                    await asyncio.sleep_ms(10)
+                sent = conn.send(mv[total_sent:])
+                if sent:
+                    total_sent += sent
+                    stalls = 0
                     continue
-                total_sent += sent
             except OSError as e:
-                if e.args[0] == 11:  # EAGAIN
-                    await asyncio.sleep_ms(10)
-                else:
+                if e.args[0] != _EAGAIN:
+                    self._closing.add(conn)
                     raise
+            # Send buffer full: plain yields first, since ACKs often free
+            # space within a loop pass; back off to 10 ms if it persists
+            stalls += 1
+            if stalls == 1:
+                deadline = time.ticks_add(time.ticks_ms(), _TIMEOUT_MS)
+            elif time.ticks_diff(deadline, time.ticks_ms()) <= 0:
+                # Client stopped reading; give up rather than hold buffers
+                self._closing.add(conn)
+                raise OSError(_ETIMEDOUT)
+            await asyncio.sleep_ms(0 if stalls <= _SEND_SPINS else 10)
     
-    async def _serve_html(self, conn):
-        """Serve HTML file in chunks."""
+    def _file_size(self, f):
+        """Return size of an open file, leaving the position at the start."""
+        size = f.seek(0, 2)
+        f.seek(0)
+        return size
+    
+    async def _stream_file(self, conn, f, header):
+        """Send header and an open file in CHUNK_SIZE pieces through a pooled buffer."""
+        header = self._head(conn, header)
+        buf = self._chunk_pool.pop() if self._chunk_pool else bytearray(CHUNK_SIZE)
+        mv = memoryview(buf)
         try:
-            # Get file size
-            stat = os.stat(HTML_FILE)
-            file_size = stat[6]
-            
-            # Send headers
-            headers = (
-                f"HTTP/1.1 200 OK\r\n"
-                f"Content-Type: text/html; charset=utf-8\r\n"
-                f"Content-Length: {file_size}\r\n"
-                f"{self._cors_headers()}"
-                f"Connection: close\r\n"
-                f"\r\n"
-            )
-            await self._sendall(conn, headers.encode())
-            
-            # Stream file in chunks
-            chunk_count = 0
-            with open(HTML_FILE, 'rb') as f:
-                while True:
-                    chunk = f.read(CHUNK_SIZE)
-                    if not chunk:
-                        break
-                    await self._sendall(conn, chunk)
-                    chunk_count += 1
-                    
-                    # Yield periodically for other tasks
-                    if chunk_count % 10 == 0:
-                        await asyncio.sleep_ms(1)
-            
+            # Header goes out in the same send as the first chunk
+            n = f.readinto(buf)
+            if not n:
+                await self._sendall(conn, header)
+                return
+            await self._sendall(conn, header + mv[:n])
+            
+            # Bind per-chunk attribute lookups to locals once
+            read = f.readinto
+            send = self._sendall
+            ticks_ms = time.ticks_ms
+            ticks_diff = time.ticks_diff
+            
+            last_yield = ticks_ms()
+            while True:
+                n = read(buf)
+                if not n:
+                    break
+                await send(conn, mv[:n])
+                
+                # Yield to other tasks by elapsed time, not chunk count
+                if ticks_diff(ticks_ms(), last_yield) > _YIELD_MS:
+                    await asyncio.sleep_ms(0)
+                    last_yield = ticks_ms()
+        finally:
+            if len(self._chunk_pool) < CHUNK_POOL_SIZE:
+                self._chunk_pool.append(buf)
+    
+    def _build_html_header(self, size, gzip=False):
+        """Build the 200 response header for an HTML body of the given size."""
+        return (_STATUS[200]
+                + b"Content-Type: text/html; charset=utf-8\r\n"
+                + (b"Content-Encoding: gzip\r\n" if gzip else b"")
+                + b"Vary: Accept-Encoding\r\n"
+                + b"Content-Length: %d\r\n" % size
+                + _CORS
+                + _KEEP_ALIVE
+                + b"\r\n")
+    
+    def _load_html_cache(self):
+        """Prebuild the HTML headers; keep each file in RAM if it is small."""
+        try:
+            f = open(HTML_FILE, 'rb')
+        except OSError:
+            return
+        with f:
+            size = self._file_size(f)
+            self._html_header = self._build_html_header(size)
+            if size <= HTML_CACHE_MAX:
+                self._html_cache = f.read()
+        
+        try:
+            f = open(HTML_GZ_FILE, 'rb')
+        except OSError:
+            return
+        with f:
+            size = self._file_size(f)
+            self._html_gz_header = self._build_html_header(size, True)
+            if size <= HTML_CACHE_MAX:
+                self._html_gz_cache = f.read()
+    
+    async def _send_cached(self, conn, header, body):
+        """Send a RAM-cached body; the header shares a send with the first chunk."""
+        await self._sendall(conn, self._head(conn, header) + body[:CHUNK_SIZE])
+        if len(body) > CHUNK_SIZE:
+            await self._sendall(conn, memoryview(body)[CHUNK_SIZE:])
+    
+    async def _serve_html(self, conn, accept_gzip=False):
+        """Serve HTML from RAM when cached, otherwise stream it in chunks."""
+        if accept_gzip and self._html_gz_header is not None:
+            # Pre-compressed copy: several times fewer bytes on the air
+            if self._html_gz_cache is not None:
+                await self._send_cached(conn, self._html_gz_header, self._html_gz_cache)
+                return True
+            try:
+                f = open(HTML_GZ_FILE, 'rb')
+            except OSError:
+                pass
+            else:
+                with f:
+                    await self._stream_file(conn, f, self._html_gz_header)
+                return True
+        
+        if self._html_cache is not None:
+            await self._send_cached(conn, self._html_header, self._html_cache)
             return True
-            
+        
+        try:
+            # Open directly (EAFP) instead of a separate existence/stat check
+            f = open(HTML_FILE, 'rb')
         except OSError as e:
             print(f"File serve error: {e}")
             # Send 404
-            response = self._json_response({"error": "HTML file not found"}, 404)
-            await self._sendall(conn, response)
+            await self._reply_err(conn, _ERR_NO_HTML)
             return False
+        
+        with f:
+            headers = self._html_header
+            if headers is None:
+                # File appeared after startup
+                headers = self._build_html_header(self._file_size(f))
+            await self._stream_file(conn, f, headers)
+        
+        return True
     
     async def _handle_ping(self, conn, params):
         """Handle /ping endpoint."""
-        response = self._json_response({
-            "status": "ok",
-            "message": "Server is running",
-            "timestamp": time.ticks_ms()
-        })
-        await self._sendall(conn, response)
+        body = b'{"status": "ok", "message": "Server is running", "timestamp": %d}' % time.ticks_ms()
+        await self._send_json_body(conn, body)
     
     async def _handle_relay(self, conn, params):
         """Handle /relay endpoint."""
-        try:
-            gpio = int(params.get('gpio', 14))
-            state = params.get('state', 'off').lower()
-            
-            if not self.gpio.is_valid_pin(gpio):
-                response = self._json_response({
-                    "error": f"Invalid GPIO pin: {gpio}. Valid pins: 14, 15, 16, 17"
-                }, 400)
-                await self._sendall(conn, response)
-                return
-            
-            if state not in ('on', 'off'):
-                response = self._json_response({
-                    "error": "State must be 'on' or 'off'"
-                }, 400)
-                await self._sendall(conn, response)
-                return
-            
-            # Set relay state
-            relay_state = state == 'on'
-            success = self.gpio.set_relay_state(gpio, relay_state)
-            
-            # Stop any timer for this pin if turning off
-            if not relay_state:
-                self.timer.stop_timer(gpio)
-            
-            if success:
-                response = self._json_response({
-                    "status": "success",
-                    "gpio": gpio,
-                    "state": state,
-                    "name": self.gpio.get_pin_name(gpio),
-                    "timestamp": time.ticks_ms()
-                })
-            else:
-                response = self._json_response({
-                    "error": "Failed to set relay state"
-                }, 500)
-            
-            await self._sendall(conn, response)
-            
-        except ValueError as e:
-            response = self._json_response({
-                "error": f"Invalid parameter: {e}"
-            }, 400)
-            await self._sendall(conn, response)
+        gpio = self._get_pin(params)
+        if gpio is None:
+            return await self._reply_err(conn, _ERR_BAD_PIN)
+        
+        relay_state = _STATE.get(params.get('state', 'off'))
+        if relay_state is None:
+            return await self._reply_err(conn, _ERR_STATE)
+        
+        # Set relay state
+        success = self.gpio.set_relay_state(gpio, relay_state)
+        
+        # Stop any timer for this pin if turning off
+        if not relay_state:
+            self.timer.stop_timer(gpio)
+        
+        if success:
+            # Fixed shape, so skip json.dumps. Bytes '%s' formatting is not
+            # reliable on MicroPython; splice the strings by concatenation.
+            body = (b'{"status": "success", "gpio": %d, "state": "' % gpio
+                    + (b'on' if relay_state else b'off')
+                    + b'", "name": "' + self.gpio.get_pin_name(gpio).encode()
+                    + b'", "timestamp": %d}' % time.ticks_ms())
+            await self._send_json_body(conn, body)
+        else:
+            await self._reply_err(conn, _ERR_RELAY)
     
     async def _handle_timer(self, conn, params):
         """Handle /timer endpoint."""
-        try:
-            gpio = int(params.get('gpio', 14))
-            duration = float(params.get('duration', 1.0))
-            
-            if not self.gpio.is_valid_pin(gpio):
-                response = self._json_response({
-                    "error": f"Invalid GPIO pin: {gpio}. Valid pins: 14, 15, 16, 17"
-                }, 400)
-                await self._sendall(conn, response)
-                return
-            
-            if duration <= 0:
-                response = self._json_response({
-                    "error": "Duration must be positive"
-                }, 400)
-                await self._sendall(conn, response)
-                return
-            
-            if duration > 3600:
-                response = self._json_response({
-                    "error": "Duration too long (max 3600s)"
-                }, 400)
-                await self._sendall(conn, response)
-                return
-            
-            # Start timer with scheduled start for synchronization
-            timer_info = self.timer.start_timer(gpio, duration, scheduled=True)
-            
-            response = self._json_response({
-                "status": "success",
-                "gpio": gpio,
-                "duration": duration,
-                "name": self.gpio.get_pin_name(gpio),
-                "message": f"Timer started for {duration}s",
-                "start_at": timer_info["start_at"],
-                "sync_delay_ms": timer_info["sync_delay_ms"],
-                "timestamp": time.ticks_ms()
-            })
-            await self._sendall(conn, response)
-            
-        except ValueError as e:
-            response = self._json_response({
-                "error": f"Invalid parameters: {e}"
-            }, 400)
-            await self._sendall(conn, response)
+        gpio = self._get_pin(params)
+        if gpio is None:
+            return await self._reply_err(conn, _ERR_BAD_PIN)
+        
+        duration = self._get_float(params, 'duration', 1.0, 0.001, 3600)
+        if duration is None:
+            return await self._reply_err(conn, _ERR_DURATION)
+        
+        # Start timer with scheduled start for synchronization
+        timer_info = self.timer.start_timer(gpio, duration, scheduled=True)
+        
+        # Fixed shape, as in /relay; the duration is formatted once and
+        # used in both the number and the message
+        secs = repr(duration).encode()
+        body = (b'{"status": "success", "gpio": %d, "duration": ' % gpio + secs
+                + b', "name": "' + self.gpio.get_pin_name(gpio).encode()
+                + b'", "message": "Timer started for ' + secs
+                + b's", "start_at": %d, "sync_delay_ms": %d, "timestamp": %d}'
+                % (timer_info["start_at"], timer_info["sync_delay_ms"], time.ticks_ms()))
+        await self._send_json_body(conn, body)
+    
+    def _relays_json(self):
+        """Serialize all relay states from the prebuilt per-relay fragments."""
+        states = self.gpio.states
+        return b'{' + b', '.join([on if states.get(pin, False) else off
+                                  for pin, off, on in _RELAY_JSON]) + b'}'
+    
+    def _status_parts(self):
+        """Body fragments shared by /status and /snapshot, up to the timestamp."""
+        # Polled constantly by the UI: only the timer details (usually
+        # empty) still go through json.dumps
+        timers = self.timer.get_all_timer_status()
+        return [
+            b'{"status": "success", "relays": ',
+            self._relays_json(),
+            b', "active_timers": %d, "timer_details": ' % self.timer.get_active_count(),
+            json.dumps(timers).encode() if timers else b'{}',
+            b', "auto_safelight": ',
+            b'true' if self.gpio.get_auto_safelight() else b'false',
+        ]
     
     async def _handle_status(self, conn, params):
         """Handle /status endpoint."""
-        states = self.gpio.get_all_states()
-        timers = self.timer.get_all_timer_status()
+        parts = self._status_parts()
+        parts.append(b', "timestamp": %d}' % time.ticks_ms())
+        await self._send_json_body(conn, b''.join(parts))
+    
+    async def _handle_snapshot(self, conn, params):
+        """
+        Handle /snapshot endpoint - all live state in one response.
         
-        response = self._json_response({
-            "status": "success",
-            "relays": states,
-            "active_timers": self.timer.get_active_count(),
-            "timer_details": timers,
-            "auto_safelight": self.gpio.get_auto_safelight(),
-            "timestamp": time.ticks_ms()
-        })
-        await self._sendall(conn, response)
+        A client polling relays, timers, temperature, WiFi and the light
+        meter gets them from one request instead of one per endpoint.
+        Fields for hardware that isn't configured are null.
+        """
+        temperature = None
+        if self.timer.temperature_sensor:
+            temperature = self.timer.get_heating_status()
+            temperature["deadzone"] = self.timer.heating_hysteresis
+        meter = self.light_meter.get_status() if self.light_meter else None
+        
+        parts = self._status_parts()
+        parts.append(b', "temperature": ')
+        parts.append(json.dumps(temperature).encode())
+        parts.append(b', "wifi": ')
+        parts.append(json.dumps(self._wifi_status()).encode())
+        parts.append(b', "light_meter": ')
+        parts.append(json.dumps(meter).encode())
+        parts.append(b', "timestamp": %d}' % time.ticks_ms())
+        await self._send_json_body(conn, b''.join(parts))
     
     async def _handle_all(self, conn, params):
         """Handle /all endpoint."""
-        state = params.get('state', 'off').lower()
+        state = params.get('state', 'off')
         
-        if state not in ('on', 'off'):
-            response = self._json_response({
-                "error": "State must be 'on' or 'off'"
-            }, 400)
-            await self._sendall(conn, response)
-            return
+        relay_state = _STATE.get(state)
+        if relay_state is None:
+            return await self._reply_err(conn, _ERR_STATE)
         
-        if state == 'on':
+        if relay_state:
             self.gpio.all_on()
         else:
             self.gpio.all_off()
             self.timer.stop_all_timers()
         
-        response = self._json_response({
-            "status": "success",
-            "state": state,
-            "results": self.gpio.get_all_states(),
-            "timestamp": time.ticks_ms()
-        })
-        await self._sendall(conn, response)
+        body = b''.join((
+            b'{"status": "success", "state": "on", "results": ' if relay_state
+            else b'{"status": "success", "state": "off", "results": ',
+            self._relays_json(),
+            b', "timestamp": %d}' % time.ticks_ms(),
+        ))
+        await self._send_json_body(conn, body)
     
     async def _handle_auto_safelight(self, conn, params):
         """Handle /auto-safelight endpoint - enable/disable automatic safelight control."""
         try:
-            enabled_str = params.get('enabled', '').strip().lower()
+            enabled_str = params.get('enabled', '').strip()
             
             if not enabled_str:
                 # GET request - return current status
-                response = self._json_response({
+                await self._send_json(conn, {
                     "status": "success",
                     "auto_safelight": self.gpio.get_auto_safelight(),
                     "description": "When enabled: Enlarger ON → Safelight OFF, Enlarger OFF → Safelight ON",
                     "timestamp": time.ticks_ms()
                 })
-                await self._sendall(conn, response)
                 return
             
-            if enabled_str not in ('true', 'false', '1', '0'):
-                response = self._json_response({
-                    "error": "enabled parameter required (true/false)"
-                }, 400)
-                await self._sendall(conn, response)
-                return
+            enabled = _ENABLED.get(enabled_str)
+            if enabled is None:
+                return await self._reply_err(conn, _ERR_ENABLED)
             
-            enabled = enabled_str in ('true', '1')
             self.gpio.set_auto_safelight(enabled)
             
-            response = self._json_response({
-                "status": "success",
-                "auto_safelight": enabled,
-                "message": f"Automatic safelight control {'enabled' if enabled else 'disabled'}",
-                "timestamp": time.ticks_ms()
-            })
-            await self._sendall(conn, response)
+            if enabled:
+                body = b'{"status": "success", "auto_safelight": true, "message": "Automatic safelight control enabled", "timestamp": %d}'
+            else:
+                body = b'{"status": "success", "auto_safelight": false, "message": "Automatic safelight control disabled", "timestamp": %d}'
+            await self._send_json_body(conn, body % time.ticks_ms())
             
         except Exception as e:
-            response = self._json_response({
-                "error": f"Failed to set auto-safelight: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Failed to set auto-safelight: {e}", 500)
     
-    async def _handle_wifi_status(self, conn, params):
-        """Handle /wifi-status endpoint."""
+    def _wifi_status(self):
+        """AP and STA details, None for an interface that isn't set up."""
         status = {
             "ap": None,
             "sta": None
@@ -465,56 +947,64 @@ class HTTPServer:
         
         if self.wifi_sta:
             status["sta"] = self.wifi_sta.get_status()
+            status["sta"]["config_state"] = self._wifi_state
         
-        response = self._json_response({
-            "status": "success",
-            "wifi": status,
-            "timestamp": time.ticks_ms()
-        })
-        await self._sendall(conn, response)
+        return status
+    
+    async def _handle_wifi_status(self, conn, params):
+        """Handle /wifi-status endpoint."""
+        # Fixed envelope as bytes; only the interface details, which carry
+        # user-chosen SSIDs that need escaping, go through json.dumps
+        await self._send_json_body(conn, b''.join((
+            b'{"status": "success", "wifi": ',
+            json.dumps(self._wifi_status()).encode(),
+            b', "timestamp": %d}' % time.ticks_ms(),
+        )))
+    
+    async def _wifi_connect(self, ssid, password):
+        """Connect STA and save the credentials, tracking progress for /wifi-status."""
+        self._wifi_state = 'connecting'
+        ip = None
+        try:
+            ip = await self.wifi_sta.connect_async(ssid, password, save=True)
+        finally:
+            self._wifi_state = 'connected' if ip else 'failed'
+        return ip
     
     async def _handle_wifi_config(self, conn, params):
         """Handle /wifi-config endpoint."""
         if not self.wifi_sta:
-            response = self._json_response({
-                "error": "WiFi STA not available"
-            }, 400)
-            await self._sendall(conn, response)
-            return
+            return await self._reply_err(conn, _ERR_NO_STA)
         
         ssid = params.get('ssid', '').strip()
         password = params.get('password', '').strip()
         
         if not ssid:
-            response = self._json_response({
-                "error": "SSID is required"
-            }, 400)
-            await self._sendall(conn, response)
-            return
+            return await self._reply_err(conn, _ERR_SSID)
         
         if len(password) < 8:
-            response = self._json_response({
-                "error": "Password must be at least 8 characters"
-            }, 400)
-            await self._sendall(conn, response)
+            return await self._reply_err(conn, _ERR_PASSWORD)
+        
+        if _ENABLED.get(params.get('wait')) is False:
+            # Reply now and associate in the background; the client polls
+            # /wifi-status for the outcome
+            if self._wifi_state != 'connecting':
+                asyncio.create_task(self._wifi_connect(ssid, password))
+            await self._send_json_body(conn, _WIFI_PENDING)
             return
         
         # Attempt connection
-        ip = await self.wifi_sta.connect_async(ssid, password, save=True)
+        ip = await self._wifi_connect(ssid, password)
         
         if ip:
-            response = self._json_response({
+            await self._send_json(conn, {
                 "status": "success",
                 "message": f"Connected to {ssid}",
                 "ip": ip,
                 "timestamp": time.ticks_ms()
             })
         else:
-            response = self._json_response({
-                "error": f"Failed to connect to {ssid}"
-            }, 400)
-        
-        await self._sendall(conn, response)
+            await self._reject(conn, f"Failed to connect to {ssid}")
     
     async def _handle_wifi_ap_force(self, conn, params):
         """Handle /wifi-ap-force endpoint - force AP (hotspot) mode."""
@@ -547,7 +1037,7 @@ class HTTPServer:
                 "error": f"Failed to switch to AP mode: {e}"
             }, 500)
         
-        await self._sendall(conn, response)
+        await self._sendall(conn, self._head(conn, response))
     
     async def _handle_wifi_clear(self, conn, params):
         """Handle /wifi-clear endpoint - clear saved WiFi credentials."""
@@ -579,20 +1069,16 @@ class HTTPServer:
                 "error": f"Failed to clear credentials: {e}"
             }, 500)
         
-        await self._sendall(conn, response)
+        await self._sendall(conn, self._head(conn, response))
     
     async def _handle_temperature(self, conn, params):
         """Handle /temperature endpoint - get current temperature reading."""
         if not self.timer.temperature_sensor:
-            response = self._json_response({
-                "error": "Temperature sensor not configured"
-            }, 400)
-            await self._sendall(conn, response)
-            return
+            return await self._reply_err(conn, _ERR_NO_TEMP)
         
         try:
             status = self.timer.get_heating_status()
-            response = self._json_response({
+            await self._send_json(conn, {
                 "status": "success",
                 "temperature": status.get("temperature"),
                 "target": status.get("target"),
@@ -602,151 +1088,97 @@ class HTTPServer:
                 "deadzone": self.timer.heating_hysteresis,
                 "timestamp": time.ticks_ms()
             })
-            await self._sendall(conn, response)
         except Exception as e:
-            response = self._json_response({
-                "error": f"Failed to read temperature: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Failed to read temperature: {e}", 500)
     
     async def _handle_temperature_control(self, conn, params):
         """Handle /temperature-control endpoint - set target temperature."""
         if not self.timer.temperature_sensor:
-            response = self._json_response({
-                "error": "Temperature sensor not configured"
-            }, 400)
-            await self._sendall(conn, response)
-            return
+            return await self._reply_err(conn, _ERR_NO_TEMP)
         
         try:
             target_str = params.get('target', '').strip()
             
             if not target_str:
-                response = self._json_response({
-                    "error": "Target temperature is required (query param: ?target=X)"
-                }, 400)
-                await self._sendall(conn, response)
-                return
+                return await self._reply_err(conn, _ERR_TARGET)
             
-            target = float(target_str)
+            target = self._get_float(params, 'target', None)
+            if target is None:
+                return await self._reject(conn, f"Invalid target temperature: {target_str}. Must be a number.")
             
             # Validate range (18°C to 40°C for photo chemicals)
-            if target < 15 or target > 50:
-                response = self._json_response({
-                    "error": f"Target temperature out of range. Valid range: 15°C - 50°C"
-                }, 400)
-                await self._sendall(conn, response)
-                return
+            if not 15 <= target <= 50:
+                return await self._reply_err(conn, _ERR_TARGET_RANGE)
             
             # Set target temperature
             self.timer.set_target_temperature(target)
             
-            response = self._json_response({
+            await self._send_json(conn, {
                 "status": "success",
                 "message": f"Target temperature set to {target}°C",
                 "target": target,
                 "timestamp": time.ticks_ms()
             })
-            await self._sendall(conn, response)
             
-        except ValueError:
-            response = self._json_response({
-                "error": f"Invalid target temperature: {params.get('target')}. Must be a number."
-            }, 400)
-            await self._sendall(conn, response)
         except Exception as e:
-            response = self._json_response({
-                "error": f"Failed to set temperature: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Failed to set temperature: {e}", 500)
     
     async def _handle_temperature_enable(self, conn, params):
         """Handle /temperature-enable endpoint - enable or disable temperature control."""
         if not self.timer.temperature_sensor:
-            response = self._json_response({
-                "error": "Temperature sensor not configured"
-            }, 400)
-            await self._sendall(conn, response)
-            return
+            return await self._reply_err(conn, _ERR_NO_TEMP)
         
         try:
-            enabled_str = params.get('enabled', '').strip().lower()
+            enabled = _ENABLED.get(params.get('enabled', '').strip())
+            if enabled is None:
+                return await self._reply_err(conn, _ERR_ENABLED)
             
-            if enabled_str not in ('true', 'false', '1', '0'):
-                response = self._json_response({
-                    "error": "enabled parameter required (true/false)"
-                }, 400)
-                await self._sendall(conn, response)
-                return
-            
-            enabled = enabled_str in ('true', '1')
             self.timer.set_heating_enabled(enabled)
             
-            response = self._json_response({
-                "status": "success",
-                "enabled": enabled,
-                "message": f"Temperature control {'enabled' if enabled else 'disabled'}",
-                "timestamp": time.ticks_ms()
-            })
-            await self._sendall(conn, response)
+            if enabled:
+                body = b'{"status": "success", "enabled": true, "message": "Temperature control enabled", "timestamp": %d}'
+            else:
+                body = b'{"status": "success", "enabled": false, "message": "Temperature control disabled", "timestamp": %d}'
+            await self._send_json_body(conn, body % time.ticks_ms())
             
         except Exception as e:
-            response = self._json_response({
-                "error": f"Failed to set temperature enable: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Failed to set temperature enable: {e}", 500)
     
     async def _handle_temperature_deadzone(self, conn, params):
         """Handle /temperature-deadzone endpoint - get or set heating dead zone (hysteresis)."""
         if not self.timer.temperature_sensor:
-            response = self._json_response({
-                "error": "Temperature sensor not configured"
-            }, 400)
-            await self._sendall(conn, response)
-            return
+            return await self._reply_err(conn, _ERR_NO_TEMP)
         
         try:
             deadzone_str = params.get('value', '').strip()
             
             if not deadzone_str:
                 # GET - return current dead zone
-                response = self._json_response({
+                await self._send_json(conn, {
                     "status": "success",
                     "deadzone": self.timer.heating_hysteresis,
                     "timestamp": time.ticks_ms()
                 })
-                await self._sendall(conn, response)
                 return
             
-            deadzone = float(deadzone_str)
+            deadzone = self._get_float(params, 'value', None)
+            if deadzone is None:
+                return await self._reject(conn, f"Invalid dead zone value: {deadzone_str}. Must be a number.")
             
-            if deadzone < 0.1 or deadzone > 5.0:
-                response = self._json_response({
-                    "error": "Dead zone out of range. Valid range: 0.1 - 5.0°C"
-                }, 400)
-                await self._sendall(conn, response)
-                return
+            if not 0.1 <= deadzone <= 5.0:
+                return await self._reply_err(conn, _ERR_DEADZONE)
             
             self.timer.heating_hysteresis = deadzone
             
-            response = self._json_response({
+            await self._send_json(conn, {
                 "status": "success",
                 "message": f"Dead zone set to +/-{deadzone}C",
                 "deadzone": deadzone,
                 "timestamp": time.ticks_ms()
             })
-            await self._sendall(conn, response)
             
-        except ValueError:
-            response = self._json_response({
-                "error": f"Invalid dead zone value: {params.get('value')}. Must be a number."
-            }, 400)
-            await self._sendall(conn, response)
         except Exception as e:
-            response = self._json_response({
-                "error": f"Failed to set dead zone: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Failed to set dead zone: {e}", 500)
     
     def _build_paper_entry(self, paper_id, paper_data):
         """Build a single paper dict for JSON serialization."""
@@ -776,58 +1208,48 @@ class HTTPServer:
             'filters': filters
         }
 
-    async def _handle_papers(self, conn, params):
+    def _build_papers_json(self):
         """
-        Handle /papers endpoint - stream papers one at a time to limit RAM use.
+        Serialize the /papers body.
         
-        Sends the JSON envelope and each paper entry individually so only one
-        paper dict is alive in memory at a time.
+        Each paper is dumped on its own, so no dict of every paper is ever
+        built. The encoded fragments are still joined at the end, so peak
+        RAM use while building is about twice the body size.
         """
-        try:
-            gc.collect()
-            paper_ids = get_paper_list()
-            count = len(paper_ids)
-
-            # Send HTTP headers (no Content-Length; Connection: close suffices)
-            header = (
-                f"HTTP/1.1 200 OK\r\n"
-                f"Content-Type: application/json\r\n"
-                f"{self._cors_headers()}"
-                f"Connection: close\r\n"
-                f"\r\n"
-            )
-            await self._sendall(conn, header.encode())
-
-            # Stream JSON: {"status":"success","count":N,"papers":[...]}
-            await self._sendall(conn, f'{{"status":"success","count":{count},"papers":['.encode())
-
-            first = True
-            for paper_id in paper_ids:
-                paper_data = get_paper_data(paper_id)
-                if not paper_data:
-                    continue
-                entry = self._build_paper_entry(paper_id, paper_data)
-                fragment = json.dumps(entry)
-                if not first:
-                    fragment = ',' + fragment
-                first = False
-                await self._sendall(conn, fragment.encode())
-                # Free per-paper objects immediately
-                del entry, fragment
-                gc.collect()
-
-            await self._sendall(conn, b']}')
-            print(f"Streamed {count} papers")
+        paper_ids = get_paper_list()
+        parts = [b'{"status":"success","count":%d,"papers":[' % len(paper_ids)]
+        for paper_id in paper_ids:
+            paper_data = get_paper_data(paper_id)
+            if not paper_data:
+                continue
+            if len(parts) > 1:
+                parts.append(b',')
+            parts.append(json.dumps(self._build_paper_entry(paper_id, paper_data)).encode())
+        parts.append(b']}')
+        return b''.join(parts)
 
-        except Exception as e:
-            print(f"ERROR in _handle_papers: {e}")
+    async def _handle_papers(self, conn, params):
+        """
+        Handle /papers endpoint - list every paper with its filters.
+        
+        The paper database only changes with an update, which soft-resets,
+        so the response is built on first use and then served from RAM.
+        """
+        if self._papers_cache is None:
             try:
-                response = self._json_response({
-                    "error": f"Failed to get papers: {e}"
-                }, 500)
-                await self._sendall(conn, response)
-            except Exception:
-                pass
+                body = self._build_papers_json()
+            except Exception as e:
+                print(f"ERROR in _handle_papers: {e}")
+                return await self._reject(conn, f"Failed to get papers: {e}", 500)
+            header = _STATUS[200] + _JSON_TYPE + b"%d" % len(body) + _JSON_TAIL
+            self._papers_cache = (header, body)
+            if _DEBUG:
+                print(f"Cached /papers ({len(body)} bytes)")
+        
+        # Not under the try: a send that fails partway must not be followed
+        # by a second response. The OSError reaches _handle_request, which
+        # closes the connection instead of keeping it alive out of sync.
+        await self._send_cached(conn, *self._papers_cache)
 
     async def _handle_light_meter_paper(self, conn, params):
         """
@@ -842,9 +1264,6 @@ class HTTPServer:
         
         Returns current paper information.
         """
-        if await self._require_light_meter(conn):
-            return
-        
         try:
             paper_id = params.get('paper_id')
             
@@ -854,35 +1273,29 @@ class HTTPServer:
             
             # GET current paper
             current_paper_id = self.light_meter.get_current_paper()
-            paper_data = get_paper_data(current_paper_id)
-            
-            if not paper_data:
-                response = self._json_response({
-                    "error": f"Invalid current paper: {current_paper_id}"
-                }, 500)
-                await self._sendall(conn, response)
-                return
+            cached = self._paper_cache
+            if cached is None or cached[0] != current_paper_id:
+                paper_data = get_paper_data(current_paper_id)
+                
+                if not paper_data:
+                    return await self._reject(conn, f"Invalid current paper: {current_paper_id}", 500)
+                
+                body = json.dumps({
+                    "status": "success",
+                    "paper_id": current_paper_id,
+                    "display_name": get_paper_display_name(current_paper_id),
+                    "manufacturer": paper_data['manufacturer'],
+                    "paper_type": paper_data.get('paper_type', '')
+                }).encode()
+                # Reopen the object so each reply only appends its timestamp
+                cached = self._paper_cache = (current_paper_id, body[:-1] + b', "timestamp": ')
             
-            response = self._json_response({
-                "status": "success",
-                "paper_id": current_paper_id,
-                "display_name": get_paper_display_name(current_paper_id),
-                "manufacturer": paper_data['manufacturer'],
-                "paper_type": paper_data.get('paper_type', ''),
-                "timestamp": time.ticks_ms()
-            })
-            await self._sendall(conn, response)
+            await self._send_json_body(conn, cached[1] + b'%d}' % time.ticks_ms())
             
         except ValueError as e:
-            response = self._json_response({
-                "error": f"Invalid paper_id: {e}"
-            }, 400)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Invalid paper_id: {e}")
         except Exception as e:
-            response = self._json_response({
-                "error": f"Failed to get/set paper: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Failed to get/set paper: {e}", 500)
     
     async def _handle_light_meter(self, conn, params):
         """
@@ -896,9 +1309,6 @@ class HTTPServer:
         
         Returns lux reading and calculated exposure time.
         """
-        if await self._require_light_meter(conn):
-            return
-        
         try:
             samples = int(params.get('samples', 5))
             calibration = params.get('calibration')
@@ -912,11 +1322,10 @@ class HTTPServer:
             result = await self.light_meter.measure_lux_async(samples=samples)
             
             if result.get('lux') is None:
-                response = self._json_response({
+                await self._send_json(conn, {
                     "error": result.get('error', "Failed to read sensor"),
                     "sensor_status": self.light_meter.sensor.get_status()
                 }, 500)
-                await self._sendall(conn, response)
                 return
             
             # Calculate exposure time using current or specified paper
@@ -930,7 +1339,7 @@ class HTTPServer:
             # Get current paper info
             current_paper_id = paper_id or self.light_meter.get_current_paper()
             
-            response = self._json_response({
+            await self._send_json(conn, {
                 "status": "success",
                 "lux": result['lux'],
                 "min_lux": result.get('min'),
@@ -944,44 +1353,25 @@ class HTTPServer:
                 "calibration": calibration or self.light_meter.default_calibration,
                 "timestamp": time.ticks_ms()
             })
-            await self._sendall(conn, response)
             
         except ValueError as e:
-            response = self._json_response({
-                "error": f"Invalid parameters: {e}"
-            }, 400)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Invalid parameters: {e}")
         except Exception as e:
-            response = self._json_response({
-                "error": f"Light meter error: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Light meter error: {e}", 500)
     
-    async def _handle_light_meter_highlight(self, conn, params):
-        """
-        Handle /light-meter-highlight endpoint - measure highlight area.
-        
-        Stores the reading for contrast analysis.
-        Place sensor at brightest area of projected image.
-        """
-        if await self._require_light_meter(conn):
-            return
-        
+    async def _measure_zone(self, conn, params, zone, label, measure):
+        """Take a highlight/shadow reading with measure() and reply with both stored values."""
         try:
             samples = int(params.get('samples', 5))
             
-            result = await self.light_meter.measure_highlight_async(samples=samples)
+            result = await measure(samples=samples)
             
             if result.get('lux') is None:
-                response = self._json_response({
-                    "error": result.get('error', "Failed to read sensor")
-                }, 500)
-                await self._sendall(conn, response)
-                return
+                return await self._reject(conn, result.get('error', "Failed to read sensor"), 500)
             
-            response = self._json_response({
+            await self._send_json(conn, {
                 "status": "success",
-                "type": "highlight",
+                "type": zone,
                 "lux": result['lux'],
                 "samples": result.get('samples'),
                 "variance": result.get('variance'),
@@ -989,13 +1379,19 @@ class HTTPServer:
                 "stored_shadow": self.light_meter.shadow_lux,
                 "timestamp": time.ticks_ms()
             })
-            await self._sendall(conn, response)
             
         except Exception as e:
-            response = self._json_response({
-                "error": f"Highlight measurement error: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"{label} measurement error: {e}", 500)
+    
+    async def _handle_light_meter_highlight(self, conn, params):
+        """
+        Handle /light-meter-highlight endpoint - measure highlight area.
+        
+        Stores the reading for contrast analysis.
+        Place sensor at brightest area of projected image.
+        """
+        await self._measure_zone(conn, params, "highlight", "Highlight",
+                                 self.light_meter.measure_highlight_async)
     
     async def _handle_light_meter_shadow(self, conn, params):
         """
@@ -1004,38 +1400,8 @@ class HTTPServer:
         Stores the reading for contrast analysis.
         Place sensor at darkest area of projected image.
         """
-        if await self._require_light_meter(conn):
-            return
-        
-        try:
-            samples = int(params.get('samples', 5))
-            
-            result = await self.light_meter.measure_shadow_async(samples=samples)
-            
-            if result.get('lux') is None:
-                response = self._json_response({
-                    "error": result.get('error', "Failed to read sensor")
-                }, 500)
-                await self._sendall(conn, response)
-                return
-            
-            response = self._json_response({
-                "status": "success",
-                "type": "shadow",
-                "lux": result['lux'],
-                "samples": result.get('samples'),
-                "variance": result.get('variance'),
-                "stored_highlight": self.light_meter.highlight_lux,
-                "stored_shadow": self.light_meter.shadow_lux,
-                "timestamp": time.ticks_ms()
-            })
-            await self._sendall(conn, response)
-            
-        except Exception as e:
-            response = self._json_response({
-                "error": f"Shadow measurement error: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+        await self._measure_zone(conn, params, "shadow", "Shadow",
+                                 self.light_meter.measure_shadow_async)
     
     async def _handle_light_meter_contrast(self, conn, params):
         """
@@ -1052,44 +1418,31 @@ class HTTPServer:
         Returns ΔEV, recommended filter grade, and split-grade calculations
         based on stored highlight and shadow readings, with tunables applied.
         """
-        if await self._require_light_meter(conn):
-            return
-
-        def _opt_float(key):
-            v = params.get(key)
-            if v is None or v == '':
-                return None
-            try:
-                return float(v)
-            except (TypeError, ValueError):
-                return None
-
         try:
             paper_id = params.get('paper_id')
 
-            calibration = _opt_float('calibration')
+            calibration = _try_float(params.get('calibration'))
 
             analysis = self.light_meter.get_contrast_analysis(
                 paper_id=paper_id,
                 calibration=calibration,
-                highlight_trim_stops=_opt_float('highlight_trim'),
-                shadow_trim_stops=_opt_float('shadow_trim'),
-                overall_offset_stops=_opt_float('overall_offset'),
-                contrast_bias_stops=_opt_float('contrast_bias'),
+                highlight_trim_stops=_try_float(params.get('highlight_trim')),
+                shadow_trim_stops=_try_float(params.get('shadow_trim')),
+                overall_offset_stops=_try_float(params.get('overall_offset')),
+                contrast_bias_stops=_try_float(params.get('contrast_bias')),
             )
 
             if 'error' in analysis:
-                response = self._json_response({
+                await self._send_json(conn, {
                     "error": analysis['error'],
                     "highlight_lux": analysis.get('highlight_lux'),
                     "shadow_lux": analysis.get('shadow_lux')
                 }, 400)
-                await self._sendall(conn, response)
                 return
 
             current_paper_id = paper_id or self.light_meter.get_current_paper()
 
-            response = self._json_response({
+            await self._send_json(conn, {
                 "status": "success",
                 "highlight_lux": analysis['highlight_lux'],
                 "shadow_lux": analysis['shadow_lux'],
@@ -1108,13 +1461,9 @@ class HTTPServer:
                 "paper_name": get_paper_display_name(current_paper_id),
                 "timestamp": time.ticks_ms()
             })
-            await self._sendall(conn, response)
 
         except Exception as e:
-            response = self._json_response({
-                "error": f"Contrast analysis error: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Contrast analysis error: {e}", 500)
     
     async def _handle_light_meter_split_grade_heiland(self, conn, params):
         """
@@ -1134,44 +1483,22 @@ class HTTPServer:
         Returns split-grade times based on the paper's softest/hardest filter pair,
         zone-target offsets, per-paper trim stops, and reciprocity correction.
         """
-        if await self._require_light_meter(conn):
-            return
-
-        def _opt_float(key):
-            v = params.get(key)
-            if v is None or v == '':
-                return None
-            try:
-                return float(v)
-            except (TypeError, ValueError):
-                return None
-
-        def _opt_int(key):
-            v = params.get(key)
-            if v is None or v == '':
-                return None
-            try:
-                return int(float(v))
-            except (TypeError, ValueError):
-                return None
-
         try:
             highlight_lux = float(params.get('highlight', 0))
             shadow_lux = float(params.get('shadow', 0))
 
-            cal_opt = _opt_float('calibration')
+            cal_opt = _try_float(params.get('calibration'))
 
             paper_id = params.get('paper_id')
             if not paper_id:
                 paper_id = params.get('system', self.light_meter.current_paper_id)
 
             if highlight_lux <= 0 or shadow_lux <= 0:
-                response = self._json_response({
+                await self._send_json(conn, {
                     "error": "Invalid lux readings (must be positive)",
                     "highlight_lux": highlight_lux,
                     "shadow_lux": shadow_lux
                 }, 400)
-                await self._sendall(conn, response)
                 return
 
             result = self.light_meter.calculate_split_grade_heiland(
@@ -1179,19 +1506,18 @@ class HTTPServer:
                 shadow_lux=shadow_lux,
                 calibration=cal_opt,
                 system=paper_id,
-                overall_offset_stops=_opt_float('overall_offset'),
-                contrast_bias_stops=_opt_float('contrast_bias'),
-                soft_trim_stops=_opt_float('soft_trim'),
-                hard_trim_stops=_opt_float('hard_trim'),
+                overall_offset_stops=_try_float(params.get('overall_offset')),
+                contrast_bias_stops=_try_float(params.get('contrast_bias')),
+                soft_trim_stops=_try_float(params.get('soft_trim')),
+                hard_trim_stops=_try_float(params.get('hard_trim')),
             )
             
             if result is None:
-                response = self._json_response({
+                await self._send_json(conn, {
                     "error": "Failed to calculate Heiland split-grade",
                     "highlight_lux": highlight_lux,
                     "shadow_lux": shadow_lux
                 }, 500)
-                await self._sendall(conn, response)
                 return
 
             # The equivalent-grade split algorithm already attaches the
@@ -1206,23 +1532,16 @@ class HTTPServer:
                     'out_of_range': result.get('equivalent_out_of_range'),
                 }
 
-            response = self._json_response({
+            await self._send_json(conn, {
                 "status": "success",
                 "result": result,
                 "timestamp": time.ticks_ms()
             })
-            await self._sendall(conn, response)
 
         except ValueError as e:
-            response = self._json_response({
-                "error": f"Invalid parameters: {e}"
-            }, 400)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Invalid parameters: {e}")
         except Exception as e:
-            response = self._json_response({
-                "error": f"Heiland split-grade calculation error: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Heiland split-grade calculation error: {e}", 500)
 
     async def _handle_light_meter_virtual_proof(self, conn, params):
         """
@@ -1235,9 +1554,6 @@ class HTTPServer:
             paper_id: Paper ID to use for curves and filter data
             filter: Filter grade for gamma selection (optional)
         """
-        if await self._require_light_meter(conn):
-            return
-
         try:
             lux = float(params.get('lux', 0))
             ref = params.get('reference_lux')
@@ -1256,29 +1572,18 @@ class HTTPServer:
             )
 
             if result.get('error'):
-                response = self._json_response({
-                    "error": result['error']
-                }, 400)
-                await self._sendall(conn, response)
-                return
+                return await self._reject(conn, result['error'])
 
-            response = self._json_response({
+            await self._send_json(conn, {
                 "status": "success",
                 "result": result,
                 "timestamp": time.ticks_ms()
             })
-            await self._sendall(conn, response)
 
         except ValueError as e:
-            response = self._json_response({
-                "error": f"Invalid parameters: {e}"
-            }, 400)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Invalid parameters: {e}")
         except Exception as e:
-            response = self._json_response({
-                "error": f"Virtual proof error: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Virtual proof error: {e}", 500)
     
     async def _handle_light_meter_calibrate(self, conn, params):
         """
@@ -1289,29 +1594,20 @@ class HTTPServer:
             constant: Calibration constant (lux × seconds)
             set_default: If 'true', set as default calibration
         """
-        if await self._require_light_meter(conn):
-            return
-        
         try:
             paper_id = params.get('paper_id', '').strip()
             constant_str = params.get('constant', '').strip()
-            set_default = params.get('set_default', '').lower() == 'true'
+            set_default = _ENABLED.get(params.get('set_default')) is True
             
             if not constant_str:
-                response = self._json_response({
-                    "error": "Calibration constant required (?constant=X)"
-                }, 400)
-                await self._sendall(conn, response)
-                return
+                return await self._reply_err(conn, _ERR_CAL_REQUIRED)
             
-            constant = float(constant_str)
+            constant = self._get_float(params, 'constant', None)
+            if constant is None:
+                return await self._reply_err(conn, _ERR_CAL_INVALID)
             
-            if constant <= 0:
-                response = self._json_response({
-                    "error": "Calibration constant must be positive"
-                }, 400)
-                await self._sendall(conn, response)
-                return
+            if not constant > 0:
+                return await self._reply_err(conn, _ERR_CAL_POSITIVE)
             
             if paper_id:
                 self.light_meter.set_calibration(paper_id, constant)
@@ -1319,25 +1615,16 @@ class HTTPServer:
             if set_default or not paper_id:
                 self.light_meter.default_calibration = constant
             
-            response = self._json_response({
+            await self._send_json(conn, {
                 "status": "success",
                 "paper_id": paper_id or "default",
                 "calibration": constant,
                 "is_default": set_default or not paper_id,
                 "timestamp": time.ticks_ms()
             })
-            await self._sendall(conn, response)
             
-        except ValueError:
-            response = self._json_response({
-                "error": "Invalid calibration value"
-            }, 400)
-            await self._sendall(conn, response)
         except Exception as e:
-            response = self._json_response({
-                "error": f"Calibration error: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Calibration error: {e}", 500)
     
     async def _handle_light_meter_config(self, conn, params):
         """
@@ -1350,15 +1637,12 @@ class HTTPServer:
             integration: 100, 200, 300, 400, 500, or 600 (ms)
             clear: 'true' to clear stored highlight/shadow readings
         """
-        if await self._require_light_meter(conn):
-            return
-        
         try:
-            paper_id = params.get('paper_id', '').strip().lower()
-            filter_system = params.get('filter_system', '').strip().lower()
-            gain = params.get('gain', '').strip().lower()
+            paper_id = self._norm(params, 'paper_id')
+            filter_system = self._norm(params, 'filter_system')
+            gain = self._norm(params, 'gain')
             integration = params.get('integration', '').strip()
-            clear = params.get('clear', '').lower() == 'true'
+            clear = _ENABLED.get(params.get('clear')) is True
             
             changes = []
             
@@ -1369,74 +1653,33 @@ class HTTPServer:
                     self.light_meter.set_current_paper(paper_id)
                     changes.append(f"paper_id={paper_id}")
                 except (KeyError, ValueError):
-                    valid_papers = get_paper_list()
-                    response = self._json_response({
-                        "error": f"Invalid paper_id. Use: {valid_papers}"
-                    }, 400)
-                    await self._sendall(conn, response)
-                    return
+                    return await self._send_error(conn, f"Invalid paper_id. Use: {get_paper_list()}")
             elif filter_system:
                 # Legacy fallback: support old filter_system param for backward compatibility
-                valid_systems = [
-                    'ilford', 'foma_fomaspeed', 'foma_fomatone',
-                    'foma_fomapastel_mg', 'fomatone_mg_classic_variant',
-                    'ilford_cooltone', 'ilford_warmtone', 'ilford_iv_rc_portfolio',
-                    'ilford_multigrade_rc_deluxe_new', 'ilford_multigrade_rc_portfolio_new',
-                    'ilford_fb_classic', 'ilford_fb_warmtone', 'ilford_fb_cooltone',
-                    'foma_fomabrom'
-                ]
-                if filter_system in valid_systems:
+                if filter_system in _FILTER_SYSTEMS:
                     self.light_meter.set_filter_system(filter_system)
                     changes.append(f"filter_system={filter_system} (legacy)")
                 else:
-                    response = self._json_response({
-                        "error": f"Invalid filter_system. Use paper_id param instead. Valid: {valid_systems}"
-                    }, 400)
-                    await self._sendall(conn, response)
-                    return
+                    return await self._send_error(conn, f"Invalid filter_system. Use paper_id param instead. Valid: {', '.join(_FILTER_SYSTEMS)}")
             
             # Set gain
             if gain:
-                gain_map = {
-                    'low': TSL2591.GAIN_LOW,
-                    'med': TSL2591.GAIN_MED,
-                    'high': TSL2591.GAIN_HIGH,
-                    'max': TSL2591.GAIN_MAX
-                }
-                
                 if gain == 'auto':
                     self.light_meter.sensor.auto_gain()
                     changes.append("gain=auto")
-                elif gain in gain_map:
-                    self.light_meter.sensor.set_gain(gain_map[gain])
+                elif gain in _GAIN_MAP:
+                    self.light_meter.sensor.set_gain(_GAIN_MAP[gain])
                     changes.append(f"gain={gain}")
                 else:
-                    response = self._json_response({
-                        "error": "Invalid gain. Use: low, med, high, max, auto"
-                    }, 400)
-                    await self._sendall(conn, response)
-                    return
+                    return await self._reply_err(conn, _ERR_GAIN)
             
             # Set integration time
             if integration:
-                int_map = {
-                    '100': TSL2591.INTEGRATIONTIME_100MS,
-                    '200': TSL2591.INTEGRATIONTIME_200MS,
-                    '300': TSL2591.INTEGRATIONTIME_300MS,
-                    '400': TSL2591.INTEGRATIONTIME_400MS,
-                    '500': TSL2591.INTEGRATIONTIME_500MS,
-                    '600': TSL2591.INTEGRATIONTIME_600MS
-                }
-                
-                if integration in int_map:
-                    self.light_meter.sensor.set_integration_time(int_map[integration])
+                if integration in _INT_MAP:
+                    self.light_meter.sensor.set_integration_time(_INT_MAP[integration])
                     changes.append(f"integration={integration}ms")
                 else:
-                    response = self._json_response({
-                        "error": "Invalid integration. Use: 100, 200, 300, 400, 500, 600"
-                    }, 400)
-                    await self._sendall(conn, response)
-                    return
+                    return await self._reply_err(conn, _ERR_INTEGRATION)
             
             # Clear readings
             if clear:
@@ -1446,19 +1689,15 @@ class HTTPServer:
             # Return current status
             status = self.light_meter.get_status()
             
-            response = self._json_response({
+            await self._send_json(conn, {
                 "status": "success",
                 "changes": changes,
                 "light_meter": status,
                 "timestamp": time.ticks_ms()
             })
-            await self._sendall(conn, response)
             
         except Exception as e:
-            response = self._json_response({
-                "error": f"Configuration error: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Configuration error: {e}", 500)
 
     async def _handle_light_meter_dark_offset(self, conn, params):
         """
@@ -1475,24 +1714,20 @@ class HTTPServer:
                      or 'status' (default — just return stored offsets).
             samples: Number of samples to average when calibrating (default 16).
         """
-        if await self._require_light_meter(conn):
-            return
-
-        action = params.get('action', 'status').strip().lower()
+        action = self._norm(params, 'action') or 'status'
 
         try:
             if action == 'calibrate':
                 samples = int(params.get('samples', 16))
                 result = await self.light_meter.sensor.calibrate_dark_offset(samples=samples)
                 if 'error' in result:
-                    response = self._json_response({
+                    await self._send_json(conn, {
                         "status": "error",
                         "error": result['error'],
                     }, 500)
-                    await self._sendall(conn, response)
                     return
                 self.light_meter._save_sensor_calibration()
-                response = self._json_response({
+                await self._send_json(conn, {
                     "status": "success",
                     "action": "calibrate",
                     "captured": result,
@@ -1501,30 +1736,22 @@ class HTTPServer:
             elif action == 'clear':
                 self.light_meter.sensor.clear_dark_offsets()
                 self.light_meter._save_sensor_calibration()
-                response = self._json_response({
+                await self._send_json(conn, {
                     "status": "success",
                     "action": "clear",
                     "dark_offsets": {},
                 })
             else:
-                response = self._json_response({
+                await self._send_json(conn, {
                     "status": "success",
                     "action": "status",
                     "dark_offsets": self.light_meter.sensor.get_dark_offsets(),
                 })
 
-            await self._sendall(conn, response)
-
         except ValueError as e:
-            response = self._json_response({
-                "error": f"Invalid parameters: {e}"
-            }, 400)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Invalid parameters: {e}")
         except Exception as e:
-            response = self._json_response({
-                "error": f"Dark-offset error: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Dark-offset error: {e}", 500)
 
     async def _handle_light_meter_gain_calibrate(self, conn, params):
         """
@@ -1536,24 +1763,20 @@ class HTTPServer:
             action: 'calibrate', 'clear', or 'status' (default).
             samples: Samples per gain stage (default 8).
         """
-        if await self._require_light_meter(conn):
-            return
-
-        action = params.get('action', 'status').strip().lower()
+        action = self._norm(params, 'action') or 'status'
 
         try:
             if action == 'calibrate':
                 samples = int(params.get('samples', 8))
                 result = await self.light_meter.sensor.calibrate_gain_factors(samples=samples)
                 if 'error' in result:
-                    response = self._json_response({
+                    await self._send_json(conn, {
                         "status": "error",
                         "error": result['error'],
                     }, 500)
-                    await self._sendall(conn, response)
                     return
                 self.light_meter._save_sensor_calibration()
-                response = self._json_response({
+                await self._send_json(conn, {
                     "status": "success",
                     "action": "calibrate",
                     "factors": self.light_meter.sensor.get_gain_factors(),
@@ -1562,32 +1785,24 @@ class HTTPServer:
             elif action == 'clear':
                 self.light_meter.sensor.clear_gain_factors()
                 self.light_meter._save_sensor_calibration()
-                response = self._json_response({
+                await self._send_json(conn, {
                     "status": "success",
                     "action": "clear",
                     "factors": self.light_meter.sensor.get_gain_factors(),
                     "calibrated": False,
                 })
             else:
-                response = self._json_response({
+                await self._send_json(conn, {
                     "status": "success",
                     "action": "status",
                     "factors": self.light_meter.sensor.get_gain_factors(),
                     "calibrated": bool(self.light_meter.sensor._gain_factors_override),
                 })
 
-            await self._sendall(conn, response)
-
         except ValueError as e:
-            response = self._json_response({
-                "error": f"Invalid parameters: {e}"
-            }, 400)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Invalid parameters: {e}")
         except Exception as e:
-            response = self._json_response({
-                "error": f"Gain calibration error: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Gain calibration error: {e}", 500)
 
     async def _handle_splitgrade_settings(self, conn, params):
         """
@@ -1608,137 +1823,233 @@ class HTTPServer:
 
         Returns the (possibly updated) effective settings.
         """
-        if await self._require_light_meter(conn):
-            return
-
-        action = params.get('action', 'get').strip().lower()
+        action = self._norm(params, 'action') or 'get'
         paper_id = params.get('paper_id') or self.light_meter.current_paper_id
 
-        def _opt_float(key):
-            v = params.get(key)
-            if v is None or v == '':
-                return None
-            try:
-                return float(v)
-            except (TypeError, ValueError):
-                return None
-
         try:
             if action == 'set':
                 self.light_meter.set_split_settings(
                     paper_id,
-                    overall_offset_stops=_opt_float('overall_offset'),
-                    contrast_bias_stops=_opt_float('contrast_bias'),
-                    soft_trim_stops=_opt_float('soft_trim'),
-                    hard_trim_stops=_opt_float('hard_trim'),
-                    contrast_highlight_trim_stops=_opt_float(
-                        'contrast_highlight_trim'),
-                    contrast_shadow_trim_stops=_opt_float(
-                        'contrast_shadow_trim'),
-                    ca_overall_offset_stops=_opt_float('ca_overall_offset'),
-                    ca_contrast_bias_stops=_opt_float('ca_contrast_bias'),
+                    overall_offset_stops=_try_float(params.get('overall_offset')),
+                    contrast_bias_stops=_try_float(params.get('contrast_bias')),
+                    soft_trim_stops=_try_float(params.get('soft_trim')),
+                    hard_trim_stops=_try_float(params.get('hard_trim')),
+                    contrast_highlight_trim_stops=_try_float(
+                        params.get('contrast_highlight_trim')),
+                    contrast_shadow_trim_stops=_try_float(
+                        params.get('contrast_shadow_trim')),
+                    ca_overall_offset_stops=_try_float(params.get('ca_overall_offset')),
+                    ca_contrast_bias_stops=_try_float(params.get('ca_contrast_bias')),
                 )
             elif action == 'clear':
                 self.light_meter.clear_split_settings(paper_id)
 
             settings = self.light_meter.get_split_settings(paper_id)
-            response = self._json_response({
+            await self._send_json(conn, {
                 "status": "success",
                 "action": action,
                 "paper_id": paper_id,
                 "settings": settings,
             })
-            await self._sendall(conn, response)
 
         except ValueError as e:
-            response = self._json_response({
-                "error": f"Invalid parameters: {e}"
-            }, 400)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Invalid parameters: {e}")
         except Exception as e:
-            response = self._json_response({
-                "error": f"Split-grade settings error: {e}"
-            }, 500)
-            await self._sendall(conn, response)
+            await self._reject(conn, f"Split-grade settings error: {e}", 500)
 
     async def _handle_options(self, conn):
         """Handle OPTIONS preflight request."""
-        response = (
-            f"HTTP/1.1 200 OK\r\n"
-            f"{self._cors_headers()}"
-            f"Content-Length: 0\r\n"
-            f"Connection: close\r\n"
-            f"\r\n"
-        )
-        await self._sendall(conn, response.encode())
+        await self._sendall(conn, self._head(conn, _OPTIONS_RESPONSE))
     
     async def _handle_request(self, conn, addr):
-        """Handle incoming HTTP request."""
+        """Handle the requests arriving on one connection."""
+        active = True  # Counted in _inflight; False while idle between requests
         try:
-            # Set socket timeout
-            conn.settimeout(SOCKET_TIMEOUT)
-            
-            # Receive request
-            data = conn.recv(2048)
-            if not data:
-                return
-            
-            # Parse request
-            method, path, params, headers, body = self._parse_request(data)
-            
-            if not method:
-                return
-            
-            # For POST requests, read the full body based on Content-Length
-            if method == 'POST' and headers:
-                content_length = int(headers.get('content-length', 0))
-                # Cap at 64 KB to protect memory
-                if content_length > 65536:
-                    response = self._json_response({'error': 'Payload too large'}, 413)
-                    await self._sendall(conn, response)
-                    return
-                while len(body) < content_length:
-                    remaining = content_length - len(body)
-                    chunk = conn.recv(min(2048, remaining))
-                    if not chunk:
+            # Non-blocking so a slow client never stalls the event loop;
+            # _recv_into/_sendall yield on EAGAIN and other connections proceed
+            conn.setblocking(False)
+            
+            # Keep-alive: polling clients reuse the connection instead of
+            # paying a handshake per request
+            timeout = _TIMEOUT_MS
+            for i in range(KEEPALIVE_MAX):
+                if i:
+                    # Idle connections give up their in-flight slot, so one
+                    # browser's idle pool can't push other clients onto the
+                    # 503; MAX_IDLE bounds them instead
+                    self._inflight -= 1
+                    active = False
+                    self._idle += 1
+                    try:
+                        ready = await self._wait_idle(conn)
+                    finally:
+                        self._idle -= 1
+                    if not ready:
                         break
-                    body += chunk
-                    await asyncio.sleep_ms(0)
-                params['__body__'] = body
-            
-            print(f"{method} {path} from {addr[0]}")
-            
-            # Handle OPTIONS preflight
-            if method == 'OPTIONS':
-                await self._handle_options(conn)
-                return
-            
-            # Route request
-            if path in ('/', '/index.html'):
-                await self._serve_html(conn)
-            elif path == '/favicon.ico':
-                response = "HTTP/1.1 204 No Content\r\nConnection: close\r\n\r\n"
-                await self._sendall(conn, response.encode())
-            else:
-                handler = self._routes.get(path)
-                if handler:
-                    await handler(conn, params)
-                else:
-                    response = self._json_response({
-                        "error": f"Not found: {path}"
-                    }, 404)
-                    await self._sendall(conn, response)
+                    self._inflight += 1
+                    active = True
+                    if _io_queue is None:
+                        # No poller to wait on: the first read polls for up
+                        # to the idle timeout instead
+                        timeout = KEEPALIVE_MS
+                if not await self._handle_one(conn, addr, timeout, i == KEEPALIVE_MAX - 1):
+                    break
                 
         except Exception as e:
             print(f"Request error: {e}")
         finally:
+            if active:
+                self._inflight -= 1
+            self._closing.discard(conn)
+            try:
+                conn.close()
+            except OSError:
+                pass
+    
+    async def _turn_away(self, conn):
+        """Send the 503 for a full server, draining the request so closing doesn't reset it."""
+        try:
+            conn.setblocking(False)
+            await self._sendall(conn, _BUSY_RESPONSE)
+            await self._drain(conn)
+        except OSError:
+            pass
+        finally:
+            self._busy -= 1
+            self._closing.discard(conn)
             try:
                 conn.close()
             except OSError:
                 pass
+    
+    async def _wait_idle(self, conn):
+        """Sleep until a kept-alive connection sends again. Returns False on idle timeout."""
+        if _io_queue is None:
+            return True
+        try:
+            # Parked on the event loop's poller like the accept loop, so an
+            # idle connection costs no wakeups until data (or EOF) arrives
+            await asyncio.wait_for_ms(_wait_readable(conn), KEEPALIVE_MS)
+        except asyncio.TimeoutError:
+            return False
+        return True
+    
+    async def _handle_one(self, conn, addr, timeout, last=False):
+        """Read and answer one request. Returns True if the connection can be reused."""
+        # Receive request into a pooled buffer, stopping as soon as the
+        # header block is complete (GETs carry no body to wait for)
+        buf = self._recv_pool.pop() if self._recv_pool else bytearray(RECV_SIZE)
+        mv = memoryview(buf)
+        try:
+            n = 0
+            while True:
+                try:
+                    got = await self._recv_into(conn, mv[n:], timeout)
+                except OSError:
+                    if n or timeout == _TIMEOUT_MS:
+                        raise
+                    # Idle keep-alive connection: close it quietly
+                    return False
+                if not got:
+                    break
+                # Scan only the new bytes, plus 3 in case CRLFCRLF straddles reads
+                start = n - 3 if n > 3 else 0
+                n += got
+                if bytes(mv[start:n]).find(b'\r\n\r\n') >= 0:
+                    break
+                if n == RECV_SIZE:
+                    self._closing.add(conn)
+                    await self._reply_err(conn, _ERR_HEADERS)
+                    await self._drain(conn)
+                    return False
+            if not n:
+                return False
+            # bytearray has no find()/split() on MicroPython, so the
+            # parser gets one exact-size copy instead of a fresh 2 KB recv
+            data = bytes(mv[:n])
+        finally:
+            if len(self._recv_pool) < RECV_POOL_SIZE:
+                self._recv_pool.append(buf)
+        
+        # Parse request
+        method, path, params, headers, body = self._parse_request(data)
+        
+        if not method:
+            return False
+        
+        # For POST requests, read the full body based on Content-Length
+        content_length = 0
+        if method == 'POST':
+            content_length = int(headers.get('content-length', 0))
+            # Cap at 64 KB to protect memory
+            if content_length > 65536:
+                self._closing.add(conn)
+                await self._reply_err(conn, _ERR_PAYLOAD)
+                await self._drain(conn, content_length - len(body))
+                return False
+            n = len(body)
+            if n < content_length:
+                # Read the rest straight into one buffer of the final
+                # size rather than growing bytes chunk by chunk
+                buf = bytearray(content_length)
+                buf[:n] = body
+                mv = memoryview(buf)
+                while n < content_length:
+                    got = await self._recv_into(conn, mv[n:])
+                    if not got:
+                        break
+                    n += got
+                # json.loads() takes bytes, not bytearray
+                body = bytes(mv[:n])
+            params['__body__'] = body
+        
+        if _DEBUG:
+            _log.append((time.ticks_ms(), method, path, addr[0]))
+        
+        # Decide before replying, so a response the server closes after says
+        # Connection: close. Close when the client asked to, when bytes of a
+        # pipelined request were read along with this one, when the route may
+        # restart the board, when this is the connection's last request, or
+        # when MAX_IDLE connections are already waiting idle.
+        keep = (not last
+                and 'close' not in headers.get('connection', '').lower()
+                and len(body) <= content_length
+                and path not in self._CLOSE_ROUTES
+                and self._idle < MAX_IDLE)
+        if not keep:
+            self._closing.add(conn)
+        
+        # Handle OPTIONS preflight
+        if method == 'OPTIONS':
+            await self._handle_options(conn)
+        
+        # Route request
+        elif path in ('/', '/index.html'):
+            await self._serve_html(conn, 'gzip' in headers.get('accept-encoding', ''))
+        elif path == '/favicon.ico':
+            await self._sendall(conn, self._head(conn, _FAVICON_RESPONSE))
+        else:
+            handler = self._ROUTES.get(path)
+            if handler and not self.light_meter and path in self._METER_ROUTES:
+                await self._reply_err(conn, _ERR_NO_METER)
+            elif handler:
+                # Plain function: no bound method allocated per request
+                await handler(self, conn, params)
+            else:
+                # Probes such as /generate_204 repeat, so these are cached too
+                await self._send_error(conn, f"Not found: {path}", 404)
+        
+        # A send that failed partway leaves the stream out of sync
+        return keep and conn not in self._closing
 
     def start(self, port=HTTP_PORT):
-        """Start HTTP server (creates socket)."""
+        """Start HTTP server (creates socket, or reuses one still open)."""
+        if self.sock:
+            # Already bound on 0.0.0.0, which follows AP/STA changes;
+            # rebinding would only leak the old socket
+            self.running = True
+            return
+        
         try:
             # Cleanup memory before starting
             gc.collect()
@@ -1802,98 +2113,73 @@ class HTTPServer:
                     pass
                 os.rename('app_data.tmp', 'app_data.json')
                 
-                gc.collect()
-                response = self._json_response({
+                await self._send_json(conn, {
                     'success': True,
                     'size': len(body),
                     'timestamp': time.ticks_ms()
                 })
-                await self._sendall(conn, response)
                 
             except ValueError:
-                response = self._json_response({'error': 'Invalid JSON'}, 400)
-                await self._sendall(conn, response)
+                await self._reply_err(conn, _ERR_BAD_JSON)
             except Exception as e:
                 print(f"[HTTPServer] app-data save error: {e}")
-                response = self._json_response({'error': str(e)}, 500)
-                await self._sendall(conn, response)
+                await self._reject(conn, str(e), 500)
         else:
             # GET - load data from flash
             try:
-                stat = os.stat('app_data.json')
-                file_size = stat[6]
-                
-                headers = (
-                    "HTTP/1.1 200 OK\r\n"
-                    "Content-Type: application/json\r\n"
-                    f"Content-Length: {file_size}\r\n"
-                    f"{self._cors_headers()}"
-                    "Connection: close\r\n"
-                    "\r\n"
-                )
-                await self._sendall(conn, headers.encode())
-                
-                # Stream file in chunks (same pattern as _serve_html)
-                with open('app_data.json', 'rb') as f:
-                    while True:
-                        chunk = f.read(CHUNK_SIZE)
-                        if not chunk:
-                            break
-                        await self._sendall(conn, chunk)
-                        
+                f = open('app_data.json', 'rb')
             except OSError:
                 # File doesn't exist yet - return empty object
-                response = self._json_response({})
-                await self._sendall(conn, response)
+                await self._send_json_body(conn, b'{}')
+                return
+            
+            with f:
+                file_size = self._file_size(f)
+                
+                headers = (_STATUS[200]
+                           + b"Content-Type: application/json\r\n"
+                           + b"Content-Length: %d\r\n" % file_size
+                           + _CORS
+                           + _KEEP_ALIVE
+                           + b"\r\n")
+                await self._stream_file(conn, f, headers)
+
+    async def _handle_log(self, conn, params):
+        """Handle GET /log - Return the recent request log (only routed when _DEBUG is on)."""
+        await self._send_json(conn, {'requests': [list(entry) for entry in _log]})
 
     async def _handle_version(self, conn, params):
         """Handle GET /version - Return current installed version."""
         if not self.update_manager:
-            response = self._json_response({
-                'version': '0.0.0'
-            })
-            await self._sendall(conn, response)
+            await self._send_json_body(conn, b'{"version": "0.0.0"}')
             return
 
-        response = self._json_response({
+        await self._send_json(conn, {
             'version': self.update_manager.current_version or '0.0.0'
         })
-        await self._sendall(conn, response)
 
     async def _handle_update_check_only(self, conn, params):
         """Handle GET /update-check-only - Check for updates without downloading."""
         try:
             if not self.update_manager:
-                response = self._json_response({
-                    'success': False,
-                    'error': 'UpdateManager not initialized'
-                }, 400)
-                await self._sendall(conn, response)
-                return
+                return await self._reply_err(conn, _ERR_NO_UPDATER)
 
             result = await self.update_manager.check_latest_release()
             status = 200 if result.get('success', False) else 400
-            response = self._json_response(result, status)
-            await self._sendall(conn, response)
+            await self._send_json(conn, result, status)
 
         except Exception as e:
             print(f"[HTTPServer] Error in /update-check-only: {e}")
-            response = self._json_response({
+            await self._send_json(conn, {
                 'success': False,
                 'error': str(e)
             }, 500)
-            await self._sendall(conn, response)
 
     async def _handle_update_check(self, conn, params):
         """Handle GET /update-check - Check for available updates from GitHub."""
         try:
             if not self.update_manager:
-                response = self._json_response({
-                    'success': False,
-                    'error': 'UpdateManager not initialized'
-                }, 400)
-                await self._sendall(conn, response)
-                return
+                return await self._reply_err(conn, _ERR_NO_UPDATER)
             
             # Check for updates and download if available
             result = await self.update_manager.check_and_download()
@@ -1901,8 +2187,7 @@ class HTTPServer:
             # Determine HTTP status
             status = 200 if result.get('success', False) else 400
             
-            response = self._json_response(result, status)
-            await self._sendall(conn, response)
+            await self._send_json(conn, result, status)
             
             # If update succeeded and restart is required, schedule restart
             if result.get('success') and result.get('restart_required'):
@@ -1914,11 +2199,10 @@ class HTTPServer:
         
         except Exception as e:
             print(f"[HTTPServer] Error in /update-check: {e}")
-            response = self._json_response({
+            await self._send_json(conn, {
                 'success': False,
                 'error': str(e)
             }, 500)
-            await self._sendall(conn, response)
     
     async def run_async(self):
         """Run HTTP server loop asynchronously."""
@@ -1934,13 +2218,47 @@ class HTTPServer:
                 try:
                     conn, addr = self.sock.accept()
                 except OSError:
-                    # No connection available (EAGAIN)
-                    await asyncio.sleep_ms(10)
+                    # No connection pending: sleep on the event loop's poller
+                    # until the listening socket is readable, rather than
+                    # waking every 10 ms to retry accept()
+                    if _io_queue is not None:
+                        await _wait_readable(self.sock)
+                    else:
+                        await asyncio.sleep_ms(10)
+                    continue
+                
+                # Small responses go out immediately instead of waiting
+                # on the delayed ACK of the previous segment
+                try:
+                    conn.setsockopt(_IPPROTO_TCP, _TCP_NODELAY, 1)
+                except OSError:
+                    pass
+                
+                # Backpressure: every task holds buffers and a PCB, so past
+                # the limit turn the client away instead of risking OOM
+                if self._inflight >= MAX_INFLIGHT:
+                    if self._busy < MAX_BUSY:
+                        self._busy += 1
+                        try:
+                            asyncio.create_task(self._turn_away(conn))
+                            continue
+                        except Exception:
+                            self._busy -= 1
+                    # Too many already draining: closing with the request
+                    # unread may reset the connection before the 503 arrives
+                    try:
+                        conn.send(_BUSY_RESPONSE)
+                    except OSError:
+                        pass
+                    conn.close()
                     continue
+                
                 # Handle request in background
+                self._inflight += 1
                 try:
                     asyncio.create_task(self._handle_request(conn, addr))
                 except Exception as e:
+                    self._inflight -= 1
                     print(f"Task creation error: {e}")
                     try:
                         conn.close()
@@ -1952,3 +2270,10 @@ class HTTPServer:
                 print(f"Server loop error: {e}")
                 await asyncio.sleep_ms(100)
 
+
+# Resolve route names once at import. The table stays on the class, so no
+# instance holds ~30 bound-method objects either.
+HTTPServer._ROUTES = {path: getattr(HTTPServer, name)
+                      for path, name in HTTPServer._ROUTES.items()}
+if _DEBUG:
+    HTTPServer._ROUTES['/log'] = HTTPServer._handle_log
@@ -84,6 +84,14 @@ class TSL2591:
         GAIN_MAX: 9876.0
     }
     
+    # Display names for get_status()
+    GAIN_NAMES = {
+        GAIN_LOW: "LOW (1x)",
+        GAIN_MED: "MED (25x)",
+        GAIN_HIGH: "HIGH (428x)",
+        GAIN_MAX: "MAX (9876x)"
+    }
+    
     # Integration time settings (register values and milliseconds)
     INTEGRATIONTIME_100MS = 0x00
     INTEGRATIONTIME_200MS = 0x01
@@ -742,17 +750,10 @@ class TSL2591:
         Returns:
             dict: Status information including settings and last readings
         """
-        gain_names = {
-            self.GAIN_LOW: "LOW (1x)",
-            self.GAIN_MED: "MED (25x)",
-            self.GAIN_HIGH: "HIGH (428x)",
-            self.GAIN_MAX: "MAX (9876x)"
-        }
-
         return {
             'connected': self.connected,
             'address': f"0x{self.address:02X}",
-            'gain': gain_names.get(self._gain, "Unknown"),
+            'gain': self.GAIN_NAMES.get(self._gain, "Unknown"),
             'gain_value': self._gain,
             'integration_ms': self.INTEGRATION_TIMES_MS.get(self._integration, 0),
             'last_lux': self.last_lux,
@@ -527,6 +527,12 @@ class UpdateManager:
             
             os.rename(tmp_path, file_path)
             
+            # Drop any gzip copy of the old version so it isn't served instead
+            try:
+                os.remove(file_path + '.gz')
+            except OSError:
+                pass
+            
             # Garbage collection after write
             gc.collect()
             
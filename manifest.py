@@ -0,0 +1,16 @@
+# Frozen-module manifest for a custom Pico 2 W firmware build.
+#
+# Freezing stores the compiled bytecode in flash, so these modules skip the
+# parse/compile step at every boot. Build from the MicroPython source tree:
+#
+#   cd ports/rp2
+#   make BOARD=RPI_PICO2_W FROZEN_MANIFEST=/path/to/enlarger_server/manifest.py
+#
+# The whole lib package is frozen. The filesystem is searched before frozen
+# modules, and a filesystem lib/ directory shadows the frozen package as a
+# whole (its submodules are looked up only there), so delete lib/ from the
+# Pico after flashing. Freezing only some of lib's modules would not work.
+
+include("$(PORT_DIR)/boards/manifest.py")
+
+package("lib")
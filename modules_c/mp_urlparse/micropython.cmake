@@ -0,0 +1,15 @@
+# User C module for CMake-based ports (rp2). Build from ports/rp2:
+#
+#   make BOARD=RPI_PICO2_W USER_C_MODULES=/path/to/enlarger_server/modules_c/mp_urlparse/micropython.cmake
+
+add_library(usermod_mp_urlparse INTERFACE)
+
+target_sources(usermod_mp_urlparse INTERFACE
+    ${CMAKE_CURRENT_LIST_DIR}/mp_urlparse.c
+)
+
+target_include_directories(usermod_mp_urlparse INTERFACE
+    ${CMAKE_CURRENT_LIST_DIR}
+)
+
+target_link_libraries(usermod INTERFACE usermod_mp_urlparse)
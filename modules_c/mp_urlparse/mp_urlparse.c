@@ -0,0 +1,68 @@
+// URL percent-decoding for the Darkroom Timer HTTP server, built into a
+// custom MicroPython firmware as a user C module.
+//
+// lib/http_server.py imports this when present and otherwise falls back to
+// the viper decoder in lib/fastparse.py, then to pure Python. All three give
+// identical output.
+
+#include "py/runtime.h"
+
+// Value of one hex digit, or -1 if c is not one.
+static inline int hex_value(byte c) {
+    if (c >= '0' && c <= '9') {
+        return c - '0';
+    }
+    c |= 0x20;  // Fold A-F onto a-f
+    if (c >= 'a' && c <= 'f') {
+        return c - 'a' + 10;
+    }
+    return -1;
+}
+
+// url_decode(buf) -> bytes
+//
+// '+' becomes a space and each valid %XX escape becomes the byte it names.
+// Anything else, including a malformed escape, is copied unchanged.
+static mp_obj_t mp_urlparse_url_decode(mp_obj_t buf_in) {
+    mp_buffer_info_t src;
+    mp_get_buffer_raise(buf_in, &src, MP_BUFFER_READ);
+    const byte *s = src.buf;
+    size_t n = src.len;
+
+    // Output is never longer than the input: one allocation, trimmed below
+    vstr_t vstr;
+    vstr_init_len(&vstr, n);
+    byte *d = (byte *)vstr.buf;
+    size_t j = 0;
+
+    for (size_t i = 0; i < n; ++i) {
+        byte c = s[i];
+        if (c == '%' && i + 2 < n) {
+            int hi = hex_value(s[i + 1]);
+            int lo = hex_value(s[i + 2]);
+            if (hi >= 0 && lo >= 0) {
+                d[j++] = (byte)((hi << 4) | lo);
+                i += 2;
+                continue;
+            }
+        }
+        d[j++] = c == '+' ? ' ' : c;
+    }
+
+    vstr.len = j;
+    return mp_obj_new_bytes_from_vstr(&vstr);
+}
+static MP_DEFINE_CONST_FUN_OBJ_1(mp_urlparse_url_decode_obj, mp_urlparse_url_decode);
+
+static const mp_rom_map_elem_t mp_urlparse_globals_table[] = {
+    { MP_ROM_QSTR(MP_QSTR___name__), MP_ROM_QSTR(MP_QSTR_mp_urlparse) },
+    { MP_ROM_QSTR(MP_QSTR_url_decode), MP_ROM_PTR(&mp_urlparse_url_decode_obj) },
+};
+static MP_DEFINE_CONST_DICT(mp_urlparse_globals, mp_urlparse_globals_table);
+
+const mp_obj_module_t mp_urlparse_user_cmodule = {
+    .base = { &mp_type_module },
+    .globals = (mp_obj_dict_t *)&mp_urlparse_globals,
+};
+
+MP_REGISTER_MODULE(MP_QSTR_mp_urlparse, mp_urlparse_user_cmodule);
@@ -0,0 +1,33 @@
+"""
+Build index.html.gz next to index.html
+Run on the desktop (CPython 3), not on the Pico
+
+The server sends the .gz copy to browsers that accept gzip. Output is
+deterministic (no timestamp or file name in the gzip header), so
+rebuilding an unchanged index.html gives an identical file.
+
+Usage: python tools/gzip_html.py [path/to/index.html]
+"""
+
+import gzip
+import os
+import sys
+
+
+def main():
+    src = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "..", "index.html")
+    dst = src + ".gz"
+
+    with open(src, "rb") as f:
+        data = f.read()
+    packed = gzip.compress(data, compresslevel=9, mtime=0)
+    with open(dst, "wb") as f:
+        f.write(packed)
+
+    print(f"{dst}: {len(data)} -> {len(packed)} bytes "
+          f"({100 * len(packed) // max(len(data), 1)}%)")
+
+
+if __name__ == "__main__":
+    main()